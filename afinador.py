@@ -6,242 +6,46 @@ Requirements:
   pip install numpy scipy sounddevice
 """
 
-import copy
-import threading
-import numpy as np
-import scipy.fftpack
-import sounddevice as sd
 import tkinter as tk
 from tkinter import ttk, scrolledtext
-from datetime import datetime
 
-SAMPLE_FREQ = 48000
-WINDOW_SIZE = 32768
-WINDOW_STEP = 8192
-NUM_HPS = 5
-POWER_THRESH = 1e-6
-WHITE_NOISE_THRESH = 0.20
-CONCERT_PITCH = 440.0
-
-SMOOTH_ALPHA = 0.25
-STABLE_FRAMES = 3
+from afinador_motor import PITCH_ENGINE, PROFILES, Tuner, make_arg_parser
+from afinador_ui import LOG_LINES, DisplayRefresher, LogBus
 
 LOW_G = False
 
-UKULELE_TARGETS = {
-    ("G4" if not LOW_G else "G3"): (392.00 if not LOW_G else 196.00),
-    "C4": 261.63,
-    "E4": 329.63,
-    "A4": 440.00,
-}
-
-DELTA_FREQ = SAMPLE_FREQ / WINDOW_SIZE
-OCTAVE_BANDS = [50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600]
-HANN_WINDOW = np.hanning(WINDOW_SIZE)
-
-
-class UkuleleTuner:
-    def __init__(self, log_callback=None):
-        self.window_samples = np.zeros(WINDOW_SIZE, dtype=np.float32)
-        self.stable_buffer = []
-        self.smooth_freq = None
-        self.is_running = False
-        self.stream = None
-        self.log_callback = log_callback
-        
-        self.current_string = "---"
-        self.detected_freq = 0.0
-        self.target_freq = 0.0
-        self.cents = 0.0
-        self.status = "ESPERANDO"
-        self.is_stable = False
-        self.signal_level = 0.0
-        
-    def log(self, message):
-        if self.log_callback:
-            self.log_callback(message)
-        
-    def cents_error(self, f_detected, f_target):
-        if f_target <= 0:
-            return 0.0
-        return 1200.0 * np.log2(f_detected / f_target)
-    
-    def find_closest_string(self, f_detected):
-        best = None
-        for s, f_t in UKULELE_TARGETS.items():
-            c = self.cents_error(f_detected, f_t)
-            score = abs(c)
-            if best is None or score < best[0]:
-                best = (score, s, f_t, c)
-        _, s, f_t, c = best
-        return s, f_t, c
-    
-    def format_status(self, cents):
-        if abs(cents) <= 5:
-            return "AFINADO"
-        return "AGUDO" if cents > 0 else "GRAVE"
-    
-    def audio_callback(self, indata, frames, time_info, status):
-        if status:
-            self.log(f"⚠️ Audio status: {status}")
-        
-        x = indata[:, 0]
-        if not np.any(x):
-            return
-        
-        self.window_samples = np.concatenate((self.window_samples, x)).astype(np.float32)
-        self.window_samples = self.window_samples[len(x):]
-        
-        signal_power = (np.linalg.norm(self.window_samples, ord=2) ** 2) / len(self.window_samples)
-        self.signal_level = signal_power
-        
-        if signal_power < POWER_THRESH:
-            if self.status != "SEÑAL BAJA":
-                self.log("🔇 Señal de audio muy baja")
-            self.status = "SEÑAL BAJA"
-            self.current_string = "---"
-            self.is_stable = False
-            return
-        
-        hann_samples = self.window_samples * HANN_WINDOW
-        magnitude_spec = np.abs(scipy.fftpack.fft(hann_samples)[:WINDOW_SIZE // 2])
-        
-        cutoff_bins = int(62 / DELTA_FREQ)
-        magnitude_spec[:cutoff_bins] = 0.0
-        
-        for j in range(len(OCTAVE_BANDS) - 1):
-            ind_start = int(OCTAVE_BANDS[j] / DELTA_FREQ)
-            ind_end = int(OCTAVE_BANDS[j + 1] / DELTA_FREQ)
-            ind_end = min(ind_end, len(magnitude_spec))
-            if ind_end <= ind_start + 1:
-                continue
-            
-            band = magnitude_spec[ind_start:ind_end]
-            avg_energy = (np.linalg.norm(band, ord=2) ** 2) / (ind_end - ind_start)
-            avg_energy = np.sqrt(avg_energy)
-            
-            thresh = WHITE_NOISE_THRESH * avg_energy
-            band[band < thresh] = 0.0
-            magnitude_spec[ind_start:ind_end] = band
-        
-        ipol_x = np.arange(0, len(magnitude_spec))
-        ipol_x2 = np.arange(0, len(magnitude_spec), 1 / NUM_HPS)
-        mag_spec_ipol = np.interp(ipol_x2, ipol_x, magnitude_spec)
-        
-        norm = np.linalg.norm(mag_spec_ipol, ord=2)
-        if norm > 0:
-            mag_spec_ipol = mag_spec_ipol / norm
-        
-        hps_spec = copy.deepcopy(mag_spec_ipol)
-        
-        for factor in range(2, NUM_HPS + 1):
-            decimated = mag_spec_ipol[::factor]
-            limit = min(len(hps_spec), len(decimated))
-            tmp = hps_spec[:limit] * decimated[:limit]
-            if not np.any(tmp):
-                break
-            hps_spec = tmp
-        
-        max_ind = int(np.argmax(hps_spec))
-        max_freq = max_ind * (SAMPLE_FREQ / WINDOW_SIZE) / NUM_HPS
-        
-        if not (150.0 <= max_freq <= 600.0):
-            if self.status != "FUERA DE RANGO":
-                self.log(f"⚠️ Frecuencia fuera de rango: {max_freq:.2f} Hz")
-            self.status = "FUERA DE RANGO"
-            self.current_string = "---"
-            self.is_stable = False
-            return
-        
-        if self.smooth_freq is None:
-            self.smooth_freq = max_freq
-        else:
-            self.smooth_freq = (1 - SMOOTH_ALPHA) * max_freq + SMOOTH_ALPHA * self.smooth_freq
-        
-        f = float(self.smooth_freq)
-        string_name, f_target, cents = self.find_closest_string(f)
-        status_txt = self.format_status(cents)
-        
-        self.stable_buffer.insert(0, string_name)
-        self.stable_buffer = self.stable_buffer[:STABLE_FRAMES]
-        stable = (self.stable_buffer.count(self.stable_buffer[0]) == len(self.stable_buffer))
-        
-        if stable and string_name != self.current_string:
-            self.log(f"🎵 Cuerda detectada: {string_name} ({f:.2f} Hz)")
-        
-        if stable and status_txt == "AFINADO" and self.status != "AFINADO":
-            self.log(f"✅ ¡{string_name} está afinado! ({cents:+.1f} cents)")
-        
-        self.current_string = string_name
-        self.detected_freq = f
-        self.target_freq = f_target
-        self.cents = cents
-        self.status = status_txt
-        self.is_stable = stable
-    
-    def start(self):
-        if not self.is_running:
-            try:
-                self.log("🎤 Iniciando captura de audio...")
-                self.is_running = True
-                self.stream = sd.InputStream(
-                    channels=1,
-                    callback=self.audio_callback,
-                    blocksize=WINDOW_STEP,
-                    samplerate=SAMPLE_FREQ,
-                    dtype="float32",
-                )
-                self.stream.start()
-                self.log(f"✅ Audio iniciado (Sample Rate: {SAMPLE_FREQ} Hz)")
-                return True
-            except Exception as e:
-                self.is_running = False
-                self.log(f"❌ Error al iniciar audio: {e}")
-                return False
-        return True
-    
-    def stop(self):
-        if self.is_running:
-            self.log("⏹️ Deteniendo afinador...")
-            self.is_running = False
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-            self.reset()
-            self.log("✅ Afinador detenido")
-    
-    def reset(self):
-        self.window_samples = np.zeros(WINDOW_SIZE, dtype=np.float32)
-        self.stable_buffer = []
-        self.smooth_freq = None
-        self.current_string = "---"
-        self.detected_freq = 0.0
-        self.target_freq = 0.0
-        self.cents = 0.0
-        self.status = "ESPERANDO"
-        self.is_stable = False
-        self.signal_level = 0.0
+PROFILE = PROFILES["ukulele-low-g" if LOW_G else "ukulele"]
+UKULELE_TARGETS = PROFILE.targets
 
 
 class TunerGUI:
-    def __init__(self, root):
+    def __init__(self, root, window_size=None, engine=PITCH_ENGINE):
         self.root = root
         self.root.title("🎸 Afinador de Ukelele FFT+HPS")
         self.root.geometry("1000x600")
         self.root.resizable(False, False)
         self.root.configure(bg="#667eea")
         
-        self.tuner = UkuleleTuner(log_callback=self.add_log)
+        self.refresher = DisplayRefresher(self.root, self.update_display)
+        self.log_bus = LogBus(self.root, self.write_log)
+        self.tuner = Tuner(PROFILE, log_callback=self.log_bus.post, window_size=window_size, engine=engine,
+                           update_callback=self.refresher.request)
+        
+        self.shown_seq = None  # Último TunerSnapshot dibujado
+        self.meter_needle = None  # Ítems de la aguja, creados por build_meter
         
         self.create_widgets()
-        self.update_display()
         self.add_log("📱 Afinador iniciado. Presiona INICIAR para comenzar.")
         
     def add_log(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
+        self.log_bus.post(message)
+    
+    def write_log(self, lines):
         self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, log_message)
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
         self.log_text.see(tk.END)
         self.log_text.config(state=tk.DISABLED)
         
@@ -293,6 +97,7 @@ class TunerGUI:
         self.meter_canvas = tk.Canvas(meter_frame, height=100, bg="#f0f0f0", 
                                      highlightthickness=0)
         self.meter_canvas.pack(fill=tk.X)
+        self.meter_canvas.bind("<Configure>", self.build_meter)
         
         self.cents_label = tk.Label(display_frame, text="0 cents", 
                                    font=("Helvetica", 24, "bold"), 
@@ -350,14 +155,17 @@ class TunerGUI:
                                                   wrap=tk.WORD)
         self.log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-    def draw_meter(self):
-        self.meter_canvas.delete("all")#
+    def build_meter(self, event=None):
+        """Dibuja las marcas fijas del medidor y crea la aguja oculta (al mostrarse y al cambiar de tamaño)"""
+        self.meter_canvas.delete("all")
+        self.meter_needle = None
         width = self.meter_canvas.winfo_width()
         height = self.meter_canvas.winfo_height()
         
         if width <= 1:
             return
         
+        self.meter_size = (width, height)
         center_x = width / 2
         
         for i in range(-50, 51, 10):
@@ -373,69 +181,102 @@ class TunerGUI:
                                              text=str(i), 
                                              font=("Helvetica", 8))
         
-        if self.tuner.is_stable and self.tuner.status != "ESPERANDO":
-            cents = max(-50, min(50, self.tuner.cents))
-            needle_x = center_x + (cents / 50) * (width / 2 - 20)
-            
+        self.meter_needle = (
+            self.meter_canvas.create_line(0, 20, 0, height - 30, width=4, state="hidden"),
+            self.meter_canvas.create_oval(0, 0, 0, 0, outline="white", width=2, state="hidden"),
+        )
+        self.meter_shown = (None, None)
+        
+        self.draw_meter(self.tuner.snapshot)
+    
+    def draw_meter(self, snap):
+        """Mueve o recolorea la aguja del medidor (sin llamadas a Tk si no cambió)"""
+        if self.meter_needle is None:
+            return
+        width, height = self.meter_size
+        center_x = width / 2
+        
+        needle_x, color = None, None
+        if snap.is_stable and snap.status != "ESPERANDO":
+            cents = max(-50, min(50, snap.cents))
+            needle_x = round(center_x + (cents / 50) * (width / 2 - 20))
             color = "#51cf66" if abs(cents) <= 5 else "#ff6b6b"
-            
-            self.meter_canvas.create_line(needle_x, 20, needle_x, height - 30,
-                                         fill=color, width=4)
-            self.meter_canvas.create_oval(needle_x - 8, height/2 - 8,
-                                         needle_x + 8, height/2 + 8,
-                                         fill=color, outline="white", width=2)
+        
+        shown_x, shown_color = self.meter_shown
+        if (needle_x, color) == self.meter_shown:
+            return
+        self.meter_shown = (needle_x, color)
+        line, hub = self.meter_needle
+        
+        if needle_x is None:
+            for item in self.meter_needle:
+                self.meter_canvas.itemconfigure(item, state="hidden")
+            return
+        
+        self.meter_canvas.coords(line, needle_x, 20, needle_x, height - 30)
+        self.meter_canvas.coords(hub, needle_x - 8, height/2 - 8, needle_x + 8, height/2 + 8)
+        if color != shown_color:
+            self.meter_canvas.itemconfigure(line, fill=color, state="normal")
+            self.meter_canvas.itemconfigure(hub, fill=color, state="normal")
     
     def update_display(self):
-        if self.tuner.is_running:
-            self.string_label.config(text=self.tuner.current_string if self.tuner.is_stable else "...")
-            
-            if self.tuner.detected_freq > 0:
-                self.freq_label.config(text=f"Detectada: {self.tuner.detected_freq:.2f} Hz")
-            else:
-                self.freq_label.config(text="Detectada: --- Hz")
-            
-            if self.tuner.target_freq > 0:
-                self.target_label.config(text=f"Objetivo: {self.tuner.target_freq:.2f} Hz")
-            else:
-                self.target_label.config(text="Objetivo: --- Hz")
-            
-            if self.tuner.is_stable and self.tuner.status != "ESPERANDO":
-                self.cents_label.config(text=f"{self.tuner.cents:+.1f} cents")
-                
-                if abs(self.tuner.cents) <= 5:
-                    self.cents_label.config(fg="#51cf66")
-                elif self.tuner.cents > 0:
-                    self.cents_label.config(fg="#ffa94d")
-                else:
-                    self.cents_label.config(fg="#ff6b6b")
-            else:
-                self.cents_label.config(text="--- cents", fg="#666")
-            
-            self.status_label.config(text=self.tuner.status)
-            
-            status_colors = {
-                "AFINADO": ("#e0ffe0", "#51cf66"),
-                "AGUDO": ("#fff3e0", "#ffa94d"),
-                "GRAVE": ("#ffe0e0", "#ff6b6b"),
-                "ESPERANDO": ("#f0f0f0", "#888"),
-                "SEÑAL BAJA": ("#f0f0f0", "#888"),
-                "FUERA DE RANGO": ("#ffe0e0", "#ff6b6b"),
-            }
-            
-            bg, fg = status_colors.get(self.tuner.status, ("#f0f0f0", "#888"))
-            self.status_label.config(bg=bg, fg=fg)
-            
-            self.draw_meter()
+        snap = self.tuner.snapshot
+        if not self.tuner.is_running or snap.seq == self.shown_seq:
+            return
+        self.shown_seq = snap.seq
+        show = self.refresher.configure
         
-        self.root.after(50, self.update_display)
+        show(self.string_label, text=snap.current_string if snap.is_stable else "...")
+        
+        if snap.detected_freq > 0:
+            show(self.freq_label, text=f"Detectada: {snap.detected_freq:.2f} Hz")
+        else:
+            show(self.freq_label, text="Detectada: --- Hz")
+        
+        if snap.target_freq > 0:
+            show(self.target_label, text=f"Objetivo: {snap.target_freq:.2f} Hz")
+        else:
+            show(self.target_label, text="Objetivo: --- Hz")
+        
+        if snap.is_stable and snap.status != "ESPERANDO":
+            if abs(snap.cents) <= 5:
+                fg = "#51cf66"
+            elif snap.cents > 0:
+                fg = "#ffa94d"
+            else:
+                fg = "#ff6b6b"
+            show(self.cents_label, text=f"{snap.cents:+.1f} cents", fg=fg)
+        else:
+            show(self.cents_label, text="--- cents", fg="#666")
+        
+        status_colors = {
+            "AFINADO": ("#e0ffe0", "#51cf66"),
+            "AGUDO": ("#fff3e0", "#ffa94d"),
+            "GRAVE": ("#ffe0e0", "#ff6b6b"),
+            "ESPERANDO": ("#f0f0f0", "#888"),
+            "SEÑAL BAJA": ("#f0f0f0", "#888"),
+            "FUERA DE RANGO": ("#ffe0e0", "#ff6b6b"),
+            "SIN TONO": ("#f0f0f0", "#888"),
+        }
+        
+        bg, fg = status_colors.get(snap.status, ("#f0f0f0", "#888"))
+        show(self.status_label, text=snap.status, bg=bg, fg=fg)
+        
+        self.draw_meter(snap)
     
     def toggle_tuner(self):
         if not self.tuner.is_running:
+            self.refresher.start()
+            self.log_bus.start()
             self.tuner.start()
+            self.shown_seq = None
+            self.refresher.invalidate()  # Al detenerse los widgets se configuran a mano
             self.control_button.config(text="⏹ DETENER", bg="#ff6b6b", 
                                       activebackground="#ee5a6f")
         else:
             self.tuner.stop()
+            self.refresher.stop()
+            self.log_bus.stop()
             self.control_button.config(text="▶ INICIAR", bg="#51cf66",
                                       activebackground="#40c057")
             
@@ -444,15 +285,18 @@ class TunerGUI:
             self.target_label.config(text="Objetivo: --- Hz")
             self.cents_label.config(text="--- cents", fg="#666")
             self.status_label.config(text="ESPERANDO", bg="#f0f0f0", fg="#888")
-            self.meter_canvas.delete("all")
+            self.draw_meter(self.tuner.snapshot)
 
 
 def main():
+    args = make_arg_parser().parse_args()
     root = tk.Tk()
-    app = TunerGUI(root)
+    app = TunerGUI(root, window_size=args.window, engine=args.engine)
     
     def on_closing():
         app.tuner.stop()
+        app.refresher.cancel()
+        app.log_bus.cancel()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
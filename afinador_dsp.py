@@ -0,0 +1,1211 @@
+"""
+Bloques de procesamiento de señal compartidos por los afinadores
+(afinador.py, afinador_pro.py y afinador_jimena.py).
+
+Requirements:
+  pip install numpy scipy
+  pip install pyfftw  (opcional)
+"""
+
+import math
+import os
+from collections import deque
+import numpy as np
+import scipy.fft
+import scipy.fftpack
+import scipy.signal
+from numpy.lib.stride_tricks import sliding_window_view
+try:
+    import pyfftw
+    import pyfftw.builders
+    FFTW_AVAILABLE = True
+except ImportError:
+    FFTW_AVAILABLE = False
+
+FFT_BACKENDS = ("rfft", "fftw", "fftpack")
+
+
+def _energy(samples):
+    """Suma de cuadrados acumulada en float64 (float32 pierde la señal débil tras una fuerte)"""
+    samples = np.asarray(samples, dtype=np.float64)
+    return float(np.dot(samples, samples))
+
+
+class RingBuffer:
+    """Buffer circular de capacidad fija para la ventana de análisis.
+
+    Cada muestra se escribe dos veces (en ``i`` y en ``i + capacity``), de modo
+    que la ventana completa siempre está disponible como una vista contigua
+    sin copiar ni reservar memoria en cada bloque de audio.
+
+    También lleva la energía de la ventana: cada ``append`` suma la del bloque
+    que entra y resta la de las muestras que salen (O(bloque) en lugar de
+    O(ventana)), y cada ``resync_every`` muestras escritas (por defecto una
+    ventana) la recalcula exacta para que el redondeo no se acumule.
+    """
+
+    def __init__(self, capacity, dtype=np.float32, resync_every=None):
+        self.capacity = capacity
+        self.resync_every = resync_every or capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._head = 0  # Posición de la muestra más antigua
+        self._energy = 0.0
+        self._since_resync = 0
+
+    def append(self, block):
+        """Agrega un bloque de muestras sobrescribiendo las más antiguas"""
+        n = len(block)
+        if n >= self.capacity:
+            block = block[n - self.capacity:]
+            n = self.capacity
+
+        start = self._head
+        # Las muestras que salen son contiguas en la primera copia
+        outgoing = self._data[start:start + n]
+        self._energy += _energy(block) - _energy(outgoing)
+
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = block[:first]
+        self._data[start + self.capacity:start + self.capacity + first] = block[:first]
+
+        rest = n - first
+        if rest > 0:
+            self._data[:rest] = block[first:]
+            self._data[self.capacity:self.capacity + rest] = block[first:]
+
+        self._head = (start + n) % self.capacity
+
+        self._since_resync += n
+        if self._since_resync >= self.resync_every:
+            self.resync()
+
+    def resync(self):
+        """Recalcula la energía exacta de la ventana"""
+        self._energy = _energy(self.view())
+        self._since_resync = 0
+
+    @property
+    def energy(self):
+        return max(self._energy, 0.0)
+
+    def mean_power(self):
+        """Potencia media de la ventana (la del acumulador, sin recorrerla)"""
+        return self.energy / self.capacity
+
+    def view(self):
+        """Vista contigua de la ventana (de la muestra más antigua a la más nueva).
+
+        La vista apunta a la memoria interna: sólo es válida hasta el siguiente
+        ``append``.
+        """
+        return self._data[self._head:self._head + self.capacity]
+
+    def reset(self):
+        self._data.fill(0.0)
+        self._head = 0
+        self._energy = 0.0
+        self._since_resync = 0
+
+
+class EnergyOnsetDetector:
+    """Detector de ataques liviano por razón de energía (O(bloque), sin FFT).
+
+    Compara la potencia media de cada bloque con un piso que sigue
+    lentamente (``floor_alpha``) a los bloques anteriores: hay ataque cuando
+    un bloque supera ``ratio`` veces el piso y además ``min_power``. Tras un
+    ataque el piso salta a la potencia del bloque, así la misma nota no
+    dispara de nuevo mientras suena y una cuerda nueva sí.
+    """
+
+    def __init__(self, ratio=4.0, min_power=1e-6, floor_alpha=0.1):
+        self.ratio = ratio
+        self.min_power = min_power
+        self.floor_alpha = floor_alpha
+        self.floor = None
+
+    def process(self, block):
+        """True si el bloque es un ataque"""
+        if not len(block):
+            return False
+        power = _energy(block) / len(block)
+        if self.floor is None:
+            self.floor = power
+            return False
+        if power >= self.min_power and power > self.ratio * self.floor:
+            self.floor = power
+            return True
+        self.floor += self.floor_alpha * (power - self.floor)
+        return False
+
+    def reset(self):
+        self.floor = None
+
+
+class Decimator:
+    """Diezmado polifásico con filtro anti-alias FIR y estado entre bloques.
+
+    Sólo se calculan las salidas que se conservan (una de cada ``factor``
+    muestras), y la cola del bloque anterior se guarda para que el filtro sea
+    continuo entre callbacks. Cada salida corresponde a la última muestra de
+    un grupo de ``factor`` entradas, así que tras un salto múltiplo de
+    ``factor`` la ventana diezmada termina justo en la muestra más nueva.
+
+    Lo que está por encima de ``out_freq - passband`` se atenúa al menos
+    ``ripple_db``; lo que se pliega desde la banda de transición cae por
+    encima de ``passband``. Sólo lo que queda por debajo de ``self.passband``
+    llega sin atenuar: el HPS no debe usar armónicos más arriba.
+    """
+
+    def __init__(self, factor, sample_freq, passband=None, ripple_db=60.0):
+        self.factor = factor
+        self.sample_freq = sample_freq
+        self.out_freq = sample_freq / factor
+
+        pass_edge = passband or 0.45 * self.out_freq
+        self.passband = pass_edge
+        stop_edge = self.out_freq - pass_edge
+        numtaps, beta = scipy.signal.kaiserord(ripple_db, (stop_edge - pass_edge) / (sample_freq / 2))
+        self.taps = scipy.signal.firwin(numtaps, (pass_edge + stop_edge) / 2,
+                                        window=("kaiser", beta), fs=sample_freq).astype(np.float32)
+        self._reversed_taps = np.ascontiguousarray(self.taps[::-1])
+        self.reset()
+
+    def process(self, block):
+        """Filtra y diezma un bloque; devuelve las muestras a out_freq"""
+        extended = np.concatenate((self._tail, block))
+        windows = sliding_window_view(extended, len(self.taps))[self._phase::self.factor]
+        out = windows @ self._reversed_taps
+
+        self._phase += len(out) * self.factor - len(block)
+        self._tail = extended[len(extended) - len(self._tail):]
+        return out
+
+    def reset(self):
+        self._tail = np.zeros(len(self.taps) - 1, dtype=np.float32)
+        self._phase = self.factor - 1
+
+
+class SpectrumEngine:
+    """Espectro de magnitud de una ventana real con ventana de Hann.
+
+    La ventana, los buffers y (si existe pyfftw) el plan de la FFT se preparan
+    una sola vez por tamaño de ventana y se reutilizan en cada cuadro.
+
+    Backends:
+      - "rfft": scipy.fft.rfft (real a complejo, sólo calcula la mitad útil)
+      - "fftw": plan de pyfftw preparado de antemano (si está instalado)
+      - "fftpack": scipy.fftpack.fft completo, la ruta original (para A/B)
+    """
+
+    def __init__(self, window_size, sample_freq, backend="rfft", workers=-1):
+        if backend not in FFT_BACKENDS:
+            raise ValueError(f"Backend de FFT desconocido: {backend}")
+        if backend == "fftw" and not FFTW_AVAILABLE:
+            backend = "rfft"
+
+        self.window_size = window_size
+        self.sample_freq = sample_freq
+        self.delta_freq = sample_freq / window_size
+        self.n_bins = window_size // 2
+        self.backend = backend
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+        self.window = np.hanning(window_size).astype(np.float32)
+        self._magnitude = np.zeros(self.n_bins, dtype=np.float32)
+
+        if backend == "fftw":
+            self._frame = pyfftw.empty_aligned(window_size, dtype="float32")
+            self._plan = pyfftw.builders.rfft(self._frame, threads=self.workers)
+        else:
+            self._frame = np.zeros(window_size, dtype=np.float32)
+            self._plan = None
+
+    def magnitude(self, samples):
+        """Aplica la ventana y devuelve |FFT| de los primeros window_size // 2 bins.
+
+        El arreglo devuelto es un buffer interno que se sobrescribe en la
+        siguiente llamada; las etapas posteriores pueden modificarlo en su lugar.
+        """
+        np.multiply(samples, self.window, out=self._frame)
+
+        if self.backend == "fftw":
+            spectrum = self._plan()
+        elif self.backend == "rfft":
+            spectrum = scipy.fft.rfft(self._frame, workers=self.workers)
+        else:
+            spectrum = scipy.fftpack.fft(self._frame)
+
+        np.abs(spectrum[:self.n_bins], out=self._magnitude)
+        return self._magnitude
+
+    def magnitude_batch(self, frames):
+        """Versión por lotes: una fila por ventana, una sola rfft sobre el eje 1"""
+        windowed = frames * self.window
+        if self.backend == "fftpack":
+            spectrum = scipy.fftpack.fft(windowed, axis=1)
+        else:
+            spectrum = scipy.fft.rfft(windowed, axis=1, workers=self.workers)
+        return np.abs(spectrum[:, :self.n_bins]).astype(np.float32)
+
+
+class ZoomSpectrumEngine:
+    """Espectro de magnitud limitado a la banda útil (0 Hz a ``max_freq``).
+
+    El bin ``k`` sigue correspondiendo a ``k * delta_freq``, así que las etapas
+    de umbral por bandas y HPS funcionan sin cambios, pero procesan unos pocos
+    miles de bins en lugar de ``window_size // 2``. La resolución es
+    configurable:
+
+      - si ``sample_freq / resolution`` es entero (p. ej. la resolución nativa
+        o un relleno con ceros x2, x4), se usa una rfft de ese largo y sólo se
+        conservan los bins de la banda;
+      - en otro caso se evalúa la banda con una transformada chirp-z
+        (Bluestein) cuyos chirps y núcleo se precalculan una sola vez.
+    """
+
+    def __init__(self, window_size, sample_freq, max_freq, resolution=None, workers=-1):
+        self.window_size = window_size
+        self.sample_freq = sample_freq
+        self.delta_freq = resolution or sample_freq / window_size
+        self.n_bins = int(np.ceil(min(max_freq, sample_freq / 2) / self.delta_freq))
+        self.max_freq = self.n_bins * self.delta_freq
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+        self.window = np.hanning(window_size).astype(np.float32)
+        self._frame = np.zeros(window_size, dtype=np.float32)
+        self._magnitude = np.zeros(self.n_bins, dtype=np.float32)
+
+        fft_len = sample_freq / self.delta_freq
+        if abs(fft_len - round(fft_len)) < 1e-9 and round(fft_len) >= window_size:
+            self._fft_len = int(round(fft_len))
+            self._czt = None
+        else:
+            self._fft_len = None
+            self._czt = self._plan_czt()
+
+    def _plan_czt(self):
+        n, m = self.window_size, self.n_bins
+        conv_len = scipy.fft.next_fast_len(n + m - 1)
+
+        # w^(k^2 / 2) con w = exp(-2j * pi * delta_freq / sample_freq)
+        k = np.arange(max(n, m), dtype=np.float64)
+        chirp = np.exp(-1j * np.pi * self.delta_freq / self.sample_freq * k ** 2)
+
+        kernel = np.zeros(conv_len, dtype=np.complex128)
+        kernel[:m] = np.conj(chirp[:m])
+        kernel[conv_len - n + 1:] = np.conj(chirp[1:n][::-1])
+
+        return {
+            "pre": chirp[:n].astype(np.complex64),
+            "post": chirp[:m].astype(np.complex64),
+            "kernel": scipy.fft.fft(kernel).astype(np.complex64),
+            "buffer": np.zeros(conv_len, dtype=np.complex64),
+        }
+
+    def magnitude(self, samples):
+        """Igual que SpectrumEngine.magnitude, pero sólo hasta max_freq"""
+        np.multiply(samples, self.window, out=self._frame)
+
+        if self._czt is None:
+            spectrum = scipy.fft.rfft(self._frame, n=self._fft_len, workers=self.workers)
+            np.abs(spectrum[:self.n_bins], out=self._magnitude)
+            return self._magnitude
+
+        czt = self._czt
+        buffer = czt["buffer"]
+        np.multiply(self._frame, czt["pre"], out=buffer[:self.window_size])
+        buffer[self.window_size:] = 0.0
+        conv = scipy.fft.fft(buffer, overwrite_x=True, workers=self.workers)
+        conv *= czt["kernel"]
+        conv = scipy.fft.ifft(conv, overwrite_x=True, workers=self.workers)
+        conv = conv[:self.n_bins]
+        conv *= czt["post"]
+        np.abs(conv, out=self._magnitude)
+        return self._magnitude
+
+    def magnitude_batch(self, frames):
+        """Versión por lotes: una fila por ventana"""
+        windowed = frames * self.window
+
+        if self._czt is None:
+            spectrum = scipy.fft.rfft(windowed, n=self._fft_len, axis=1, workers=self.workers)
+            return np.abs(spectrum[:, :self.n_bins]).astype(np.float32)
+
+        czt = self._czt
+        conv_len = len(czt["buffer"])
+        buffer = np.zeros((len(frames), conv_len), dtype=np.complex64)
+        np.multiply(windowed, czt["pre"], out=buffer[:, :self.window_size])
+        conv = scipy.fft.fft(buffer, axis=1, overwrite_x=True, workers=self.workers)
+        conv *= czt["kernel"]
+        conv = scipy.fft.ifft(conv, axis=1, overwrite_x=True, workers=self.workers)
+        conv = conv[:, :self.n_bins] * czt["post"]
+        return np.abs(conv).astype(np.float32)
+
+
+def octave_band_edges(f_start, f_stop, bands_per_octave=1):
+    """Bordes de bandas de 1/bands_per_octave de octava entre f_start y f_stop"""
+    n_bands = int(round(bands_per_octave * np.log2(f_stop / f_start)))
+    return [f_start * 2 ** (i / bands_per_octave) for i in range(n_bands + 1)]
+
+
+class BandGate:
+    """Umbral de ruido blanco por bandas, vectorizado.
+
+    Para cada banda se calcula el RMS de la magnitud y se anulan los bins por
+    debajo de ``thresh * RMS`` (misma semántica que WHITE_NOISE_THRESH en el
+    bucle original). Los límites de banda se calculan una sola vez por
+    (resolución, número de bins); por cuadro sólo hay un np.add.reduceat y una
+    máscara, sin bucles en Python sin importar cuántas bandas haya.
+    """
+
+    def __init__(self, band_edges, delta_freq, n_bins, thresh):
+        self.thresh = thresh
+
+        bands = []
+        for f_lo, f_hi in zip(band_edges[:-1], band_edges[1:]):
+            ind_start = int(f_lo / delta_freq)
+            ind_end = min(int(f_hi / delta_freq), n_bins)
+            if ind_end <= ind_start + 1:
+                continue
+            bands.append((ind_start, ind_end))
+
+        self.start = bands[0][0] if bands else 0
+        self.end = bands[-1][1] if bands else 0
+
+        # Segmentos contiguos; los huecos entre bandas quedan con umbral 0
+        offsets, gated, lengths = [], [], []
+        position = self.start
+        for ind_start, ind_end in bands:
+            if ind_start > position:
+                offsets.append(position - self.start)
+                gated.append(False)
+                lengths.append(ind_start - position)
+            offsets.append(ind_start - self.start)
+            gated.append(True)
+            lengths.append(ind_end - ind_start)
+            position = ind_end
+
+        self.n_bands = len(bands)
+        self._offsets = np.array(offsets, dtype=np.intp)
+        self._scale = np.where(gated, 1.0 / np.maximum(lengths, 1), 0.0)
+        self._bin_segment = np.repeat(np.arange(len(offsets)), lengths)
+
+        width = self.end - self.start
+        self._squares = np.zeros(width, dtype=np.float64)
+        self._energy = np.zeros(len(offsets), dtype=np.float64)
+        self._bin_thresh = np.zeros(width, dtype=np.float64)
+        self._mask = np.zeros(width, dtype=bool)
+
+    def apply(self, magnitude_spec):
+        """Aplica el umbral en su lugar y devuelve el mismo arreglo"""
+        if self.n_bands == 0:
+            return magnitude_spec
+
+        spec = magnitude_spec[self.start:self.end]
+        np.square(spec, out=self._squares)
+        np.add.reduceat(self._squares, self._offsets, out=self._energy)
+
+        # thresh * sqrt(energía media de la banda)
+        self._energy *= self._scale
+        np.sqrt(self._energy, out=self._energy)
+        self._energy *= self.thresh
+
+        np.take(self._energy, self._bin_segment, out=self._bin_thresh)
+        np.less(spec, self._bin_thresh, out=self._mask)
+        np.putmask(spec, self._mask, 0.0)
+        return magnitude_spec
+
+    def apply_batch(self, magnitude_specs):
+        """Versión por lotes (una fila por cuadro), en su lugar"""
+        if self.n_bands == 0:
+            return magnitude_specs
+
+        spec = magnitude_specs[:, self.start:self.end]
+        energy = np.add.reduceat(np.square(spec, dtype=np.float64), self._offsets, axis=1)
+        energy *= self._scale
+        thresh = self.thresh * np.sqrt(energy)
+        spec[spec < thresh[:, self._bin_segment]] = 0.0
+        return magnitude_specs
+
+
+class PitchednessClassifier:
+    """Preclasificador barato: decide si un cuadro tiene tono antes del HPS.
+
+    Mira sólo las últimas ``frame_size`` muestras. Primero calcula la tasa de
+    cruces por cero (O(N), sin FFT): el ruido blanco cruza cero en casi la
+    mitad de las muestras y una cuerda, muchas menos. Después calcula la
+    planitud espectral (media geométrica / media aritmética de la potencia)
+    de una rfft corta con Hann en la banda ``[min_freq, max_freq]``, tras
+    quitar la pendiente (recta en log-potencia vs log-frecuencia) para que el
+    ruido rosa o marrón no parezca tonal. El ruido da ~0.56 y una nota con
+    armónicos queda muy por debajo.
+
+    ``is_pitched`` deja en ``score`` una confianza 0..1 (1 = claramente
+    tonal); ``classify_batch`` hace lo mismo por filas.
+    """
+
+    NOISE_FLATNESS = float(np.exp(-np.euler_gamma))  # Planitud esperada del periodograma del ruido
+
+    def __init__(self, sample_freq, min_freq, max_freq, frame_size=4096, max_flatness=0.3,
+                 max_zcr=0.4):
+        self.frame_size = frame_size
+        self.max_flatness = max_flatness
+        self.max_zcr = max_zcr
+        delta_freq = sample_freq / frame_size
+        self._lo = max(1, int(min_freq / delta_freq))
+        self._hi = max(self._lo + 3, min(frame_size // 2, int(np.ceil(max_freq / delta_freq)) + 1))
+        self._window = np.hanning(frame_size).astype(np.float32)
+
+        # Ajuste por mínimos cuadrados de la pendiente, preparado una sola vez
+        log_freq = np.log(np.arange(self._lo, self._hi))
+        self._trend_basis = np.stack([np.ones_like(log_freq), log_freq], axis=1)
+        self._trend_fit = np.linalg.pinv(self._trend_basis)
+        self.score = 0.0
+
+    def zero_crossing_rate(self, frames):
+        signs = np.signbit(frames)
+        return np.count_nonzero(signs[..., 1:] != signs[..., :-1], axis=-1) / (frames.shape[-1] - 1)
+
+    def flatness(self, frames):
+        spec = scipy.fft.rfft(frames * self._window, axis=-1)[..., self._lo:self._hi]
+        log_power = np.log(spec.real ** 2 + spec.imag ** 2 + np.finfo(np.float32).tiny)
+        log_power -= (log_power @ self._trend_fit.T) @ self._trend_basis.T
+        return np.exp(log_power.mean(axis=-1)) / np.exp(log_power).mean(axis=-1)
+
+    def classify_batch(self, frames):
+        """Máscara de cuadros con tono y su confianza (una fila por cuadro)"""
+        frames = np.asarray(frames)[:, -self.frame_size:]
+        pitched = self.zero_crossing_rate(frames) <= self.max_zcr
+        scores = np.zeros(len(frames))
+        if np.any(pitched):
+            flatness = self.flatness(frames[pitched])
+            scores[pitched] = np.clip(1.0 - flatness / self.NOISE_FLATNESS, 0.0, 1.0)
+            pitched[pitched] = flatness <= self.max_flatness
+        return pitched, scores
+
+    def is_pitched(self, window_samples):
+        pitched, scores = self.classify_batch(window_samples[np.newaxis, :])
+        self.score = float(scores[0])
+        return bool(pitched[0])
+
+
+class HPSKernel:
+    """Harmonic Product Spectrum sin reservas de memoria por cuadro.
+
+    Equivale al bucle original (interpolación x``num_hps`` con np.interp,
+    normalización y producto con el espectro diezmado por 2..``num_hps``),
+    pero las tablas y buffers float32 se preparan una sola vez por
+    configuración y todos los productos se hacen en su lugar.
+
+    Con ``band = (bin_bajo, bin_alto)`` (bins nativos, fraccionarios) la
+    fundamental sólo se busca ahí: se interpolan los bins hasta el armónico
+    ``num_hps`` del borde superior y el producto y el argmax recorren sólo la
+    banda, así que un pico más fuerte fuera de ella no puede ganar.
+    """
+
+    def __init__(self, n_bins, num_hps, band=None):
+        self.n_bins = n_bins
+        self.num_hps = num_hps
+        self.length = n_bins * num_hps
+
+        # Espectro interpolado: la columna k guarda el punto j + k / num_hps
+        self._ipol = np.zeros(self.length, dtype=np.float32)
+        self._ipol_cols = self._ipol.reshape(n_bins, num_hps)
+        self._fractions = [k / num_hps for k in range(num_hps)]
+        self._next = np.zeros(n_bins, dtype=np.float32)
+        self._slope = np.zeros(n_bins, dtype=np.float32)
+
+        # Largo del producto tras cada factor (igual que limit en el bucle original)
+        self._full_limits = {}
+        limit = self.length
+        for factor in range(2, num_hps + 1):
+            limit = min(limit, -(-self.length // factor))
+            self._full_limits[factor] = limit
+        scratch_len = self._full_limits[2] if num_hps >= 2 else 0
+        self._scratch = (np.zeros(scratch_len, dtype=np.float32),
+                         np.zeros(scratch_len, dtype=np.float32))
+        self.spectrum = self._ipol
+        self.set_band(band)
+
+    def set_band(self, band):
+        """Fija la banda de búsqueda de la fundamental (None = todo el espectro)"""
+        if band is None:
+            self.lo, self.top = 0, self.length
+            self._limits = dict(self._full_limits)
+            self.n_used = self.n_bins
+            return
+        # El armónico num_hps del borde superior tiene que caer dentro del espectro
+        highest = self._full_limits[self.num_hps] if self.num_hps >= 2 else self.length
+        self.top = max(1, min(highest, int(np.floor(band[1] * self.num_hps)) + 1))
+        self.lo = min(self.top - 1, max(0, int(np.ceil(band[0] * self.num_hps))))
+        self._limits = {factor: self.top for factor in self._full_limits}
+        self.n_used = min(self.n_bins, self.top)
+
+    def interpolate(self, magnitude_spec):
+        """Interpolación lineal x num_hps (como np.interp) normalizada en su lugar.
+
+        Con una banda sólo se calculan los primeros ``n_used`` bins.
+        """
+        if len(magnitude_spec) != self.n_bins:
+            raise ValueError(f"Se esperaban {self.n_bins} bins, llegaron {len(magnitude_spec)}")
+
+        n = self.n_used
+        if n < self.n_bins:
+            self._next[:n] = magnitude_spec[1:n + 1]
+        else:
+            self._next[:-1] = magnitude_spec[1:]
+            self._next[-1] = magnitude_spec[-1]
+        np.subtract(self._next[:n], magnitude_spec[:n], out=self._slope[:n])
+        for k, fraction in enumerate(self._fractions):
+            column = self._ipol_cols[:n, k]
+            np.multiply(self._slope[:n], fraction, out=column)
+            column += magnitude_spec[:n]
+
+        used = self._ipol[:n * self.num_hps]
+        norm = np.sqrt(np.dot(used, used))
+        if norm > 0:
+            used /= norm
+        return self._ipol
+
+    def peak_index(self, magnitude_spec):
+        """Índice del máximo del HPS (en bins interpolados)"""
+        ipol = self.interpolate(magnitude_spec)
+
+        lo = self.lo
+        current = ipol[lo:self.top]
+        swap = 0
+        for factor in range(2, self.num_hps + 1):
+            count = self._limits[factor] - lo
+            product = self._scratch[swap][:count]
+            np.multiply(current[:count], ipol[factor * lo::factor][:count], out=product)
+            if not product.any():
+                break
+            current = product
+            swap ^= 1
+
+        self.spectrum = current
+        return lo + int(np.argmax(current))
+
+    def peak_indices(self, magnitude_specs):
+        """Versión vectorizada de peak_index para un lote (una fila por cuadro).
+
+        Cada fila respeta el corte del bucle original: si el producto con un
+        factor queda en cero, su pico se toma del producto anterior.
+        """
+        n_frames = len(magnitude_specs)
+        if magnitude_specs.shape[1] != self.n_bins:
+            raise ValueError(f"Se esperaban {self.n_bins} bins, "
+                             f"llegaron {magnitude_specs.shape[1]}")
+
+        n = self.n_used
+        mags = magnitude_specs[:, :n].astype(np.float32, copy=False)
+        slope = np.empty_like(mags)
+        np.subtract(mags[:, 1:], mags[:, :-1], out=slope[:, :-1])
+        if n < self.n_bins:
+            slope[:, -1] = magnitude_specs[:, n] - mags[:, -1]
+        else:
+            slope[:, -1] = 0.0
+
+        ipol = np.empty((n_frames, n, self.num_hps), dtype=np.float32)
+        for k, fraction in enumerate(self._fractions):
+            column = ipol[:, :, k]
+            np.multiply(slope, fraction, out=column)
+            column += mags
+        ipol = ipol.reshape(n_frames, n * self.num_hps)
+
+        norms = np.sqrt(np.einsum("ij,ij->i", ipol, ipol))
+        ipol /= np.where(norms > 0, norms, 1.0)[:, None].astype(np.float32)
+
+        lo = self.lo
+        peaks = np.zeros(n_frames, dtype=np.intp)
+        done = np.zeros(n_frames, dtype=bool)
+        current = ipol[:, lo:self.top]
+        for factor in range(2, self.num_hps + 1):
+            count = self._limits[factor] - lo
+            product = current[:, :count] * ipol[:, factor * lo::factor][:, :count]
+            stopped = ~done & ~product.any(axis=1)
+            if stopped.any():
+                peaks[stopped] = lo + np.argmax(current[stopped], axis=1)
+                done |= stopped
+            if done.all():
+                return peaks
+            current = product
+
+        peaks[~done] = lo + np.argmax(current[~done], axis=1)
+        return peaks
+
+
+def refine_peak_bin(magnitude, k, hann=True):
+    """Posición fraccionaria del máximo local en el bin ``k``.
+
+    Con ``hann=True`` (espectro de ventana de Hann a resolución nativa) usa la
+    interpolación de Grandke, exacta para un tono aislado; en otro caso
+    (espectro sobremuestreado) ajusta una parábola al logaritmo de la
+    magnitud (interpolación gaussiana).
+    """
+    left, center, right = magnitude[k - 1], magnitude[k], magnitude[k + 1]
+    if center <= 0:
+        return float(k)
+
+    if hann:
+        ratio = max(left, right) / center
+        offset = (2.0 * ratio - 1.0) / (ratio + 1.0)
+        offset = min(max(offset, 0.0), 0.5)
+        return k + offset if right > left else k - offset
+
+    if left <= 0 or right <= 0:
+        return float(k)
+    a, b, c = np.log(left), np.log(center), np.log(right)
+    curvature = a - 2.0 * b + c
+    if curvature >= 0:
+        return float(k)
+    return k + 0.5 * (a - c) / curvature
+
+
+def refine_fundamental(magnitude, f0, delta_freq, n_harmonics=3, hann=True):
+    """Afina f0 por debajo de un bin usando la fundamental y sus armónicos.
+
+    Cada armónico h aporta la posición interpolada de su pico; la fundamental
+    es el ajuste por mínimos cuadrados de ``pico_h = h * f0`` ponderado por
+    la amplitud, así que los armónicos altos (más finos en cents) pesan más.
+    """
+    num = den = 0.0
+    for h in range(1, n_harmonics + 1):
+        k = int(round(h * f0 / delta_freq))
+        if k < 2 or k + 2 >= len(magnitude):
+            break
+        k = k - 1 + int(np.argmax(magnitude[k - 1:k + 2]))
+        amplitude = float(magnitude[k])
+        if amplitude <= 0:
+            continue
+        position = refine_peak_bin(magnitude, k, hann)
+        num += amplitude * h * position * delta_freq
+        den += amplitude * h * h
+    return num / den if den > 0 else f0
+
+
+def harmonic_ratio(magnitude, f0, delta_freq, n_harmonics=5):
+    """Fracción de la energía del espectro que cae en f0 y sus armónicos (0..1)"""
+    total = float(np.dot(magnitude, magnitude))
+    if f0 <= 0 or total <= 0:
+        return 0.0
+    centers = np.rint(np.arange(1, n_harmonics + 1) * f0 / delta_freq).astype(np.intp)
+    centers = centers[(centers >= 1) & (centers + 1 < len(magnitude))]
+    bins = magnitude[(centers[:, np.newaxis] + np.arange(-1, 2)).ravel()]
+    return min(1.0, float(np.dot(bins, bins)) / total)
+
+
+class HPSPitchEstimator:
+    """Cadena espectro -> corte de graves -> umbral por bandas -> HPS.
+
+    ``estimate`` procesa una ventana; ``estimate_batch`` procesa varias
+    ventanas a la vez (una rfft 2-D y HPS vectorizado) para ponerse al día
+    cuando el hilo de análisis se atrasa. Los lotes se parten en grupos de
+    a lo sumo ``batch_bins`` bins interpolados para que quepan en caché: con
+    el espectro completo (81920 bins por cuadro) un lote grande es más lento
+    que cuadro por cuadro, así que en ese caso se procesa de a uno. Hacer en
+    lote sólo la rfft tampoco gana ahí (la rfft ya usa varios hilos y el HPS
+    domina), así que con la configuración por defecto "catch-up" sólo ahorra
+    la cola de saltos salteados, no CPU por cuadro.
+
+    La confianza (``confidence`` tras ``estimate``, ``confidences`` tras
+    ``estimate_batch``) es la fracción de energía armónica del espectro.
+    """
+
+    def __init__(self, spectrum, noise_gate, hps, cutoff_freq, refine_harmonics=0,
+                 batch_bins=2 ** 17):
+        self.spectrum = spectrum
+        self.noise_gate = noise_gate
+        self.hps = hps
+        self.cutoff_bins = int(cutoff_freq / spectrum.delta_freq)
+        self.freq_per_index = spectrum.delta_freq / hps.num_hps
+        self.batch_rows = max(1, batch_bins // hps.length)
+
+        # Refinamiento sub-bin sobre el espectro sin umbral (0 = desactivado)
+        self.refine_harmonics = refine_harmonics
+        native_delta = spectrum.sample_freq / spectrum.window_size
+        self._hann_bins = abs(spectrum.delta_freq - native_delta) < 1e-9 * native_delta
+        self._raw = np.zeros(spectrum.n_bins, dtype=np.float32)
+        self.confidence = 0.0
+        self.confidences = np.zeros(0)
+
+    def refine(self, raw_magnitude, f0):
+        if not self.refine_harmonics or f0 <= 0:
+            return f0
+        return refine_fundamental(raw_magnitude, f0, self.spectrum.delta_freq,
+                                  self.refine_harmonics, hann=self._hann_bins)
+
+    def confidence_of(self, raw_magnitude, f0):
+        return harmonic_ratio(raw_magnitude, f0, self.spectrum.delta_freq, self.hps.num_hps)
+
+    def estimate(self, window_samples):
+        magnitude_spec = self.spectrum.magnitude(window_samples)
+        np.copyto(self._raw, magnitude_spec)
+        magnitude_spec[:self.cutoff_bins] = 0.0
+        self.noise_gate.apply(magnitude_spec)
+        f0 = self.refine(self._raw, self.hps.peak_index(magnitude_spec) * self.freq_per_index)
+        self.confidence = self.confidence_of(self._raw, f0)
+        return f0
+
+    def estimate_batch(self, frames):
+        if self.batch_rows == 1:
+            freqs, confidences = [], []
+            for frame in frames:
+                freqs.append(self.estimate(frame))
+                confidences.append(self.confidence)
+            self.confidences = np.array(confidences)
+            return np.array(freqs)
+        rows = [self._estimate_rows(frames[i:i + self.batch_rows])
+                for i in range(0, len(frames), self.batch_rows)]
+        self.confidences = np.concatenate([confidences for _, confidences in rows])
+        return np.concatenate([freqs for freqs, _ in rows])
+
+    def _estimate_rows(self, frames):
+        magnitude_specs = self.spectrum.magnitude_batch(frames)
+        raw = magnitude_specs.copy()
+        magnitude_specs[:, :self.cutoff_bins] = 0.0
+        self.noise_gate.apply_batch(magnitude_specs)
+        freqs = self.hps.peak_indices(magnitude_specs) * self.freq_per_index
+        freqs = np.array([self.refine(row, f0) for row, f0 in zip(raw, freqs)])
+        confidences = np.array([self.confidence_of(row, f0) for row, f0 in zip(raw, freqs)])
+        return freqs, confidences
+
+
+class NSDFPitchEstimator:
+    """Estimador McLeod (NSDF) en el dominio del tiempo.
+
+    La función de diferencia cuadrada normalizada
+    ``n(tau) = 2 r(tau) / m(tau)`` se arma con la autocorrelación por FFT
+    (relleno a 2N, sin aliasing circular) y sumas acumuladas de energía.
+    El período es el primer máximo clave (el mayor de cada lóbulo positivo)
+    que supera ``threshold`` veces el máximo global, afinado con una parábola.
+    Sólo necesita unos pocos períodos: ~40 ms alcanzan para C4 o E2, frente a
+    los 680 ms de la ventana de 32768 muestras del HPS.
+
+    ``estimate`` devuelve 0.0 si no encuentra un período con claridad
+    ``min_clarity``; la claridad (el valor del NSDF en el pico) queda en
+    ``confidence`` tras ``estimate`` y en ``confidences`` tras ``estimate_batch``.
+    """
+
+    def __init__(self, window_size, sample_freq, min_freq, max_freq, threshold=0.9,
+                 min_clarity=0.5, workers=-1):
+        self.window_size = window_size
+        self.sample_freq = sample_freq
+        self.threshold = threshold
+        self.min_clarity = min_clarity
+        self.workers = workers
+        self.min_lag = max(2, int(sample_freq / max_freq))
+        self.max_lag = min(window_size // 2, int(np.ceil(sample_freq / min_freq)) + 1)
+        self.n_fft = scipy.fft.next_fast_len(2 * window_size, real=True)
+        self._lags = np.arange(self.max_lag + 1)
+        self.confidence = 0.0
+        self.confidences = np.zeros(0)
+
+    def nsdf_batch(self, frames):
+        """NSDF de cada fila para lags 0..max_lag"""
+        x = np.asarray(frames, dtype=np.float64)
+        x = x - x.mean(axis=-1, keepdims=True)
+        spec = scipy.fft.rfft(x, n=self.n_fft, axis=-1, workers=self.workers)
+        power = spec.real ** 2 + spec.imag ** 2
+        acf = scipy.fft.irfft(power, n=self.n_fft, axis=-1, workers=self.workers)[:, :self.max_lag + 1]
+
+        # m(tau) = sum_{j < N-tau} x_j^2 + sum_{j >= tau} x_j^2 con sumas acumuladas
+        energy = np.zeros((len(x), x.shape[1] + 1))
+        np.cumsum(x * x, axis=-1, out=energy[:, 1:])
+        n = x.shape[1]
+        m = energy[:, n - self._lags] + energy[:, n:] - energy[:, self._lags]
+        return 2.0 * acf / np.maximum(m, np.finfo(np.float64).tiny)
+
+    def pick_period(self, nsdf):
+        """Lag fraccionario del período y su claridad (0.0 si no hay)"""
+        below = np.flatnonzero(nsdf <= 0)
+        if not len(below):
+            return 0.0, 0.0
+        start = below[0]
+        positive = np.diff((nsdf[start:] > 0).astype(np.int8))
+        rises = np.flatnonzero(positive == 1) + 1 + start
+        falls = np.flatnonzero(positive == -1) + 1 + start
+        if len(falls) < len(rises):
+            falls = np.append(falls, len(nsdf))
+
+        peaks = [rise + int(np.argmax(nsdf[rise:fall])) for rise, fall in zip(rises, falls)]
+        peaks = [lag for lag in peaks if self.min_lag <= lag < self.max_lag]
+        if not peaks:
+            return 0.0, 0.0
+        best = max(nsdf[lag] for lag in peaks)
+        lag = next(lag for lag in peaks if nsdf[lag] >= self.threshold * best)
+
+        a, b, c = nsdf[lag - 1], nsdf[lag], nsdf[lag + 1]
+        curvature = a - 2.0 * b + c
+        offset = 0.5 * (a - c) / curvature if curvature < 0 else 0.0
+        clarity = b - 0.25 * (a - c) * offset
+        return lag + offset, clarity
+
+    def estimate(self, window_samples):
+        f0 = self.estimate_batch(window_samples[np.newaxis])[0]
+        self.confidence = self.confidences[0]
+        return f0
+
+    def estimate_batch(self, frames):
+        freqs = np.zeros(len(frames))
+        self.confidences = np.zeros(len(frames))
+        for i, nsdf in enumerate(self.nsdf_batch(frames)):
+            period, clarity = self.pick_period(nsdf)
+            if period > 0 and clarity >= self.min_clarity:
+                freqs[i] = self.sample_freq / period
+                self.confidences[i] = min(1.0, clarity)
+        return freqs
+
+
+class GoertzelPitchEstimator:
+    """Estimador de banda angosta para una cuerda conocida (modo manual).
+
+    En lugar del espectro completo evalúa la DTFT de la ventana de Hann sólo
+    en ``points`` frecuencias separadas medio bin alrededor de cada armónico
+    h * f0 (h = 1..n_harmonics): un banco de Goertzel escrito como producto
+    matricial. Con N = L * M y n = M * a + b, ``e^{-jwn} = e^{-jwMa} e^{-jwb}``,
+    así que cada frecuencia necesita L + M fasores en lugar de N.
+
+    Sigue la nota cuadro a cuadro: centra la grilla en la última estimación,
+    la corre si el máximo cae en un borde y afina cada pico con una parábola
+    sobre el logaritmo de la magnitud. Sin nota enganchada barre
+    ``span_cents`` alrededor de ``target_freq`` con la suma de armónicos.
+
+    ``confidence`` es la fracción de la energía de la ventana que cae en los
+    picos seguidos; por debajo de ``min_confidence`` devuelve 0.0.
+    """
+
+    def __init__(self, window_size, sample_freq, target_freq, n_harmonics=4, span_cents=100.0,
+                 points=5, max_shifts=3, min_confidence=0.05):
+        self.window_size = window_size
+        self.sample_freq = sample_freq
+        self.n_harmonics = n_harmonics
+        self.span_cents = span_cents
+        self.max_shifts = max_shifts
+        self.min_confidence = min_confidence
+        self.delta_freq = sample_freq / window_size
+        self.step = self.delta_freq / 2
+        self.window = np.hanning(window_size).astype(np.float32)
+
+        # Factorización n = M * a + b (se rellena con ceros hasta L * M)
+        self._m = 2 ** int(np.log2(window_size) // 2)
+        self._l = -(-window_size // self._m)
+        self._inner_n = np.arange(self._m, dtype=np.float64)
+        self._outer_n = np.arange(self._l, dtype=np.float64) * self._m
+        self._frame = np.zeros(self._l * self._m, dtype=np.float32)
+
+        # |X(f)|^2 de una senoidal sobre la energía de la ventana (Parseval)
+        self._energy_gain = float(self.window.sum()) ** 2 / (2.0 * float(np.dot(self.window, self.window)))
+        self._harmonics = np.arange(1, n_harmonics + 1)
+        self._offsets = (np.arange(points) - points // 2) * self.step
+
+        # El centro se cuantiza a step / n_harmonics para reutilizar los fasores
+        self._grid = self.step / n_harmonics
+        self._banks = {}
+        self._track_shape = np.empty((n_harmonics, points))
+        self.confidence = 0.0
+        self.confidences = np.zeros(0)
+        self.set_target(target_freq)
+
+    def set_target(self, target_freq):
+        self.target_freq = target_freq
+        self._center = None
+        self._banks.clear()
+
+    def phasor_bank(self, freqs):
+        """Fasores de las frecuencias pedidas: [cos | sin] internos y externos"""
+        omega = (2 * np.pi / self.sample_freq) * np.ravel(freqs)
+        inner = np.outer(self._inner_n, omega)
+        outer = np.outer(self._outer_n, omega)
+        inner_trig = np.concatenate((np.cos(inner), np.sin(inner)), axis=1).astype(np.float32)
+        cos_outer, sin_outer = np.cos(outer), np.sin(outer)
+        # (C - jS) * (cos - j sin): Re = C cos - S sin, Im = C sin + S cos
+        outer_trig = np.stack((np.concatenate((cos_outer, -sin_outer), axis=1),
+                               np.concatenate((sin_outer, cos_outer), axis=1))).astype(np.float32)
+        return inner_trig, outer_trig
+
+    def power_at(self, freqs, bank=None):
+        """|X(f)|^2 de la ventana cargada en las frecuencias pedidas"""
+        inner_trig, outer_trig = bank if bank is not None else self.phasor_bank(freqs)
+
+        # Sumas internas C = x·cos, S = x·sin en un solo producto real; luego
+        # el fasor externo de cada bloque, sumado sobre los bloques
+        partial = self._frame.reshape(self._l, self._m) @ inner_trig
+        spectrum = np.einsum("lk,mlk->mk", partial, outer_trig).astype(np.float64)
+        n_freqs = spectrum.shape[1] // 2
+        spectrum = spectrum[:, :n_freqs] + spectrum[:, n_freqs:]
+        power = spectrum[0] ** 2 + spectrum[1] ** 2
+        return power.reshape(np.shape(freqs))
+
+    def _tracking_power(self, center_index):
+        """Potencia en la grilla de seguimiento, con los fasores en caché por centro"""
+        bank = self._banks.get(center_index)
+        if bank is None:
+            if len(self._banks) >= 256:
+                self._banks.clear()
+            freqs = np.add.outer(self._harmonics * (center_index * self._grid), self._offsets)
+            bank = self._banks[center_index] = self.phasor_bank(freqs)
+        return self.power_at(self._track_shape, bank)
+
+    def _acquire(self):
+        ratio = 2 ** (self.span_cents / 1200)
+        candidates = np.arange(self.target_freq / ratio, self.target_freq * ratio, self.step)
+        power = self.power_at(np.outer(self._harmonics, candidates))
+        return float(candidates[np.argmax(power.sum(axis=0))])
+
+    def estimate(self, window_samples):
+        np.multiply(window_samples, self.window, out=self._frame[:self.window_size])
+        energy = float(np.dot(self._frame, self._frame)) * self._energy_gain
+        self.confidence = 0.0
+        if energy <= 0:
+            self._center = None
+            return 0.0
+
+        center = self._center if self._center is not None else self._acquire()
+        center_index = int(round(center / self._grid))
+        middle = len(self._offsets) // 2
+        for _ in range(self.max_shifts + 1):
+            power = self._tracking_power(center_index)
+            peaks = np.argmax(power, axis=1)
+            strongest = int(np.argmax(power.max(axis=1)))
+            shift = peaks[strongest] - middle
+            if abs(shift) < middle:
+                break
+            center_index += int(round(shift * self.n_harmonics / self._harmonics[strongest]))
+        center = center_index * self._grid
+
+        # Parábola sobre log|X| en cada armónico cuyo máximo no quedó en un borde
+        num = den = peak_power = 0.0
+        for h, row, k in zip(range(1, self.n_harmonics + 1), power.tolist(), peaks.tolist()):
+            if not 0 < k < len(row) - 1 or min(row[k - 1], row[k], row[k + 1]) <= 0:
+                continue
+            a, b, c = math.log(row[k - 1]), math.log(row[k]), math.log(row[k + 1])
+            curvature = a - 2.0 * b + c
+            offset = 0.5 * (a - c) / curvature if curvature < 0 else 0.0
+            position = h * center + (k - middle + offset) * self.step
+            weight = math.sqrt(row[k]) * h
+            num += weight * position
+            den += weight * h
+            peak_power += row[k]
+
+        f0 = num / den if den > 0 else 0.0
+        self.confidence = min(1.0, peak_power / energy)
+        ratio = 2 ** (self.span_cents / 1200)
+        if self.confidence < self.min_confidence or not (self.target_freq / ratio <= f0 <= self.target_freq * ratio):
+            self._center = None
+            self.confidence = 0.0
+            return 0.0
+        self._center = f0
+        return f0
+
+    def estimate_batch(self, frames):
+        freqs = np.zeros(len(frames))
+        self.confidences = np.zeros(len(frames))
+        for i, frame in enumerate(frames):
+            freqs[i] = self.estimate(frame)
+            self.confidences[i] = self.confidence
+        return freqs
+
+
+class SlidingDFTTracker:
+    """DFT deslizante modulada (mSDFT) de unos pocos bins alrededor de f0 y
+    sus armónicos, para seguir la cuerda entre pasadas completas del HPS.
+
+    Guarda ``Y_k = sum x(i) e^{-j2pi k i/N}`` con el índice absoluto i módulo
+    N: cada bloque suma ``(entrante - saliente) @ T`` con fasores tomados de
+    una tabla periódica en vez de una recursión, así que el error no crece con
+    el tiempo (estable, a diferencia del SDFT recursivo). El costo es O(bins x bloque) por bloque.
+    ``lock(f0, frame)`` elige los bins (+-span_bins*h alrededor de cada
+    armónico h) y los inicializa con una rfft de la ventana actual; al
+    bloquearse de nuevo también se resincroniza el error de redondeo.
+
+    ``estimate`` aplica Hann en frecuencia (0.5 X[k] - 0.25 (X[k-1] + X[k+1]))
+    y afina con ``refine_fundamental``; ``needs_lock`` avisa cuando la nota se
+    acerca al borde de los bins seguidos.
+    """
+
+    def __init__(self, window_size, sample_freq, n_harmonics=4, span_bins=3, block_size=512):
+        self.window_size = window_size
+        self.sample_freq = sample_freq
+        self.n_harmonics = n_harmonics
+        self.span_bins = span_bins
+        self.block_size = block_size
+        self.delta_freq = sample_freq / window_size
+        self._twiddle = np.exp(-2j * np.pi * np.arange(window_size) / window_size)
+        self._magnitude = np.zeros(window_size // 2 + 1)
+        self.f0 = 0.0
+        self.confidence = 0.0
+        self.locked = False
+        self.needs_lock = False
+
+    def lock(self, f0, frame):
+        """Centra los bins en f0 y los inicializa con la ventana ``frame`` (N muestras)"""
+        n = self.window_size
+        centers = [int(round(h * f0 / self.delta_freq)) for h in range(1, self.n_harmonics + 1)]
+        # Bins para Hann (+-1) y para interpolar alrededor del pico (+-2)
+        runs = [np.arange(c - self.span_bins * h - 3, c + self.span_bins * h + 4)
+                for h, c in enumerate(centers, start=1)]
+        bins = np.concatenate(runs)
+        if bins[0] < 1 or bins[-1] >= n // 2:
+            self.unlock()
+            return
+
+        lengths = np.array([len(run) for run in runs])
+        starts = np.cumsum(lengths) - lengths
+        # Posiciones con vecinos a ambos lados dentro de la misma corrida (Hann)
+        inner = np.concatenate([np.arange(start + 1, start + length - 1)
+                                for start, length in zip(starts, lengths)])
+        self._centers = np.array(centers)
+        self._bins = bins
+        self._inner = inner
+        self._peak_starts = starts - 2 * np.arange(len(runs))
+        self._table = self._phasor_table(bins)
+        self._y = scipy.fft.rfft(frame)[bins]
+        self._energy = float(np.dot(frame, frame))
+        self._index = 0
+        self._magnitude[:] = 0.0
+        self.f0 = f0
+        self.locked = True
+        self.needs_lock = False
+
+    def _phasor_table(self, bins):
+        """T[i, k] = e^{-j2pi k i/N} para i < block_size, duplicando filas ya calculadas"""
+        table = np.empty((self.block_size, len(bins)), dtype=np.complex128)
+        table[0] = 1.0
+        filled = 1
+        while filled < self.block_size:
+            count = min(filled, self.block_size - filled)
+            table[filled:filled + count] = table[:count] * self._twiddle[(bins * filled) % self.window_size]
+            filled += count
+        return table
+
+    def unlock(self):
+        self.locked = False
+        self.needs_lock = False
+
+    def update(self, outgoing, incoming):
+        """Avanza la ventana: ``outgoing`` sale y ``incoming`` entra (mismo largo)"""
+        for start in range(0, len(incoming), self.block_size):
+            new = np.asarray(incoming[start:start + self.block_size], dtype=np.float64)
+            old = np.asarray(outgoing[start:start + self.block_size], dtype=np.float64)
+            phase = self._twiddle[(self._bins * self._index) % self.window_size]
+            self._y += phase * ((new - old) @ self._table[:len(new)])
+            self._energy += float(np.dot(new, new) - np.dot(old, old))
+            self._index = (self._index + len(new)) % self.window_size
+
+    def estimate(self):
+        # X_k de la ventana actual (que empieza en el índice absoluto _index)
+        spectrum = self._y * np.conj(self._twiddle[(self._bins * self._index) % self.window_size])
+        windowed = np.abs(0.5 * spectrum[self._inner]
+                          - 0.25 * (spectrum[self._inner - 1] + spectrum[self._inner + 1]))
+        self._magnitude[self._bins[self._inner]] = windowed
+        peak_power = float(np.sum(np.maximum.reduceat(windowed, self._peak_starts) ** 2))
+
+        self.f0 = refine_fundamental(self._magnitude, self.f0, self.delta_freq,
+                                     self.n_harmonics, hann=True)
+        drift = np.abs(np.rint(np.arange(1, self.n_harmonics + 1) * self.f0 / self.delta_freq)
+                       - self._centers)
+        self.needs_lock = bool(np.any(drift > self.span_bins * np.arange(1, self.n_harmonics + 1)))
+
+        # |X_hann|^2 de una senoidal = (A N / 4)^2 y su energía A^2 N / 2
+        energy = max(self._energy, np.finfo(np.float64).tiny)
+        self.confidence = min(1.0, 8.0 * peak_power / (self.window_size * energy))
+        return self.f0
+
+
+class PitchTracker:
+    """Seguimiento de la frecuencia entre lecturas: mediana + Kalman 1-D en cents.
+
+    Cada lectura se pasa a cents respecto de ``ref_freq`` y entra en una
+    mediana de las últimas ``median_size`` (un cuadro aislado con la octava
+    equivocada no llega al filtro). La mediana alimenta un Kalman de paseo
+    aleatorio: ``drift_cents`` es cuánto puede moverse la nota entre lecturas
+    y ``noise_cents`` el error de una lectura. Una mediana a más de
+    ``outlier_cents`` del estado se descarta; ``max_outliers`` descartes
+    seguidos son una nota nueva y reinician el filtro en ella. Todo es O(1)
+    por lectura.
+
+    ``frequency``, ``std_cents`` y ``confidence`` (1 con el filtro seguro,
+    0.5 con una desviación de ``lock_cents``) describen el estado; ``locked``
+    indica al menos ``lock_readings`` lecturas y ``std_cents <= lock_cents``.
+    """
+
+    def __init__(self, median_size=3, noise_cents=5.0, drift_cents=2.0, outlier_cents=300.0,
+                 max_outliers=2, lock_cents=4.0, lock_readings=2, ref_freq=440.0):
+        self.median_size = median_size
+        self.noise_var = noise_cents ** 2
+        self.drift_var = drift_cents ** 2
+        self.outlier_cents = outlier_cents
+        self.max_outliers = max_outliers
+        self.lock_cents = lock_cents
+        self.lock_readings = lock_readings
+        self.ref_freq = ref_freq
+        self.rejected = 0  # Lecturas descartadas desde el último reset
+        self.reset()
+
+    def reset(self):
+        self._recent = deque(maxlen=self.median_size)
+        self.cents = None
+        self.variance = np.inf
+        self.readings = 0
+        self.outliers = 0
+
+    @property
+    def frequency(self):
+        if self.cents is None:
+            return 0.0
+        return self.ref_freq * 2.0 ** (self.cents / 1200.0)
+
+    @property
+    def std_cents(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def confidence(self):
+        return 1.0 / (1.0 + self.variance / self.lock_cents ** 2)
+
+    @property
+    def locked(self):
+        return self.readings >= self.lock_readings and self.std_cents <= self.lock_cents
+
+    def update(self, freq):
+        """Agrega una lectura en Hz; False si se descartó como valor aislado"""
+        self._recent.append(1200.0 * math.log2(freq / self.ref_freq))
+        ordered = sorted(self._recent)
+        mid = len(ordered) // 2
+        measured = ordered[mid] if len(ordered) % 2 else 0.5 * (ordered[mid - 1] + ordered[mid])
+
+        if self.cents is None:
+            self.cents, self.variance, self.readings = measured, self.noise_var, 1
+            return True
+
+        if abs(measured - self.cents) > self.outlier_cents:
+            self.outliers += 1
+            self.rejected += 1
+            if self.outliers < self.max_outliers:
+                return False
+            # Varios descartes seguidos: es otra nota, empezar de nuevo desde ella
+            recent = self._recent[-1]
+            self.reset()
+            self._recent.append(recent)
+            self.cents, self.variance, self.readings = recent, self.noise_var, 1
+            return True
+
+        self.outliers = 0
+        prior = self.variance + self.drift_var
+        gain = prior / (prior + self.noise_var)
+        self.cents += gain * (measured - self.cents)
+        self.variance = (1.0 - gain) * prior
+        self.readings += 1
+        return True
+
+
+def make_spectrum_engine(window_size, sample_freq, mode="full", backend="rfft", workers=-1,
+                         max_freq=None, resolution=None):
+    """Crea el motor de espectro según el modo ("full" o "zoom")"""
+    if mode == "zoom":
+        return ZoomSpectrumEngine(window_size, sample_freq, max_freq, resolution=resolution,
+                                  workers=workers)
+    if mode != "full":
+        raise ValueError(f"Modo de espectro desconocido: {mode}")
+    return SpectrumEngine(window_size, sample_freq, backend=backend, workers=workers)
@@ -6,230 +6,26 @@ Requirements:
   pip install numpy scipy sounddevice customtkinter pillow
 """
 
-import copy
-import threading
-import numpy as np
-import scipy.fftpack
-import sounddevice as sd
 import customtkinter as ctk
 from tkinter import Canvas
 from PIL import Image
-from datetime import datetime
 import os
+import time
+
+from afinador_motor import PITCH_ENGINE, PROFILES, Tuner, make_arg_parser
+from afinador_ui import LOG_LINES, DisplayRefresher, LogBus
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("dark-blue")
 
-SAMPLE_FREQ = 48000
-WINDOW_SIZE = 32768
-WINDOW_STEP = 8192
-NUM_HPS = 5
-POWER_THRESH = 1e-6
-WHITE_NOISE_THRESH = 0.20
-CONCERT_PITCH = 440.0
-
-SMOOTH_ALPHA = 0.25
-STABLE_FRAMES = 3
-
 LOW_G = False
 
-UKULELE_TARGETS = {
-    ("G4" if not LOW_G else "G3"): (392.00 if not LOW_G else 196.00),
-    "C4": 261.63,
-    "E4": 329.63,
-    "A4": 440.00,
-}
-
-DELTA_FREQ = SAMPLE_FREQ / WINDOW_SIZE
-OCTAVE_BANDS = [50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600]
-HANN_WINDOW = np.hanning(WINDOW_SIZE)
-
-
-class UkuleleTuner:
-    def __init__(self, log_callback=None):
-        self.window_samples = np.zeros(WINDOW_SIZE, dtype=np.float32)
-        self.stable_buffer = []
-        self.smooth_freq = None
-        self.is_running = False
-        self.stream = None
-        self.log_callback = log_callback
-        
-        self.current_string = "---"
-        self.detected_freq = 0.0
-        self.target_freq = 0.0
-        self.cents = 0.0
-        self.status = "ESPERANDO"
-        self.is_stable = False
-        self.signal_level = 0.0
-        
-    def log(self, message):
-        if self.log_callback:
-            self.log_callback(message)
-        
-    def cents_error(self, f_detected, f_target):
-        if f_target <= 0:
-            return 0.0
-        return 1200.0 * np.log2(f_detected / f_target)
-    
-    def find_closest_string(self, f_detected):
-        best = None
-        for s, f_t in UKULELE_TARGETS.items():
-            c = self.cents_error(f_detected, f_t)
-            score = abs(c)
-            if best is None or score < best[0]:
-                best = (score, s, f_t, c)
-        _, s, f_t, c = best
-        return s, f_t, c
-    
-    def format_status(self, cents):
-        if abs(cents) <= 5:
-            return "AFINADO"
-        return "AGUDO" if cents > 0 else "GRAVE"
-    
-    def audio_callback(self, indata, frames, time_info, status):
-        if status:
-            self.log(f"⚠️ Audio status: {status}")
-        
-        x = indata[:, 0]
-        if not np.any(x):
-            return
-        
-        self.window_samples = np.concatenate((self.window_samples, x)).astype(np.float32)
-        self.window_samples = self.window_samples[len(x):]
-        
-        signal_power = (np.linalg.norm(self.window_samples, ord=2) ** 2) / len(self.window_samples)
-        self.signal_level = signal_power
-        
-        if signal_power < POWER_THRESH:
-            if self.status != "SEÑAL BAJA":
-                self.log("🔇 Señal de audio muy baja")
-            self.status = "SEÑAL BAJA"
-            self.current_string = "---"
-            self.is_stable = False
-            return
-        
-        hann_samples = self.window_samples * HANN_WINDOW
-        magnitude_spec = np.abs(scipy.fftpack.fft(hann_samples)[:WINDOW_SIZE // 2])
-        
-        cutoff_bins = int(62 / DELTA_FREQ)
-        magnitude_spec[:cutoff_bins] = 0.0
-        
-        for j in range(len(OCTAVE_BANDS) - 1):
-            ind_start = int(OCTAVE_BANDS[j] / DELTA_FREQ)
-            ind_end = int(OCTAVE_BANDS[j + 1] / DELTA_FREQ)
-            ind_end = min(ind_end, len(magnitude_spec))
-            if ind_end <= ind_start + 1:
-                continue
-            
-            band = magnitude_spec[ind_start:ind_end]
-            avg_energy = (np.linalg.norm(band, ord=2) ** 2) / (ind_end - ind_start)
-            avg_energy = np.sqrt(avg_energy)
-            
-            thresh = WHITE_NOISE_THRESH * avg_energy
-            band[band < thresh] = 0.0
-            magnitude_spec[ind_start:ind_end] = band
-        
-        ipol_x = np.arange(0, len(magnitude_spec))
-        ipol_x2 = np.arange(0, len(magnitude_spec), 1 / NUM_HPS)
-        mag_spec_ipol = np.interp(ipol_x2, ipol_x, magnitude_spec)
-        
-        norm = np.linalg.norm(mag_spec_ipol, ord=2)
-        if norm > 0:
-            mag_spec_ipol = mag_spec_ipol / norm
-        
-        hps_spec = copy.deepcopy(mag_spec_ipol)
-        
-        for factor in range(2, NUM_HPS + 1):
-            decimated = mag_spec_ipol[::factor]
-            limit = min(len(hps_spec), len(decimated))
-            tmp = hps_spec[:limit] * decimated[:limit]
-            if not np.any(tmp):
-                break
-            hps_spec = tmp
-        
-        max_ind = int(np.argmax(hps_spec))
-        max_freq = max_ind * (SAMPLE_FREQ / WINDOW_SIZE) / NUM_HPS
-        
-        if not (150.0 <= max_freq <= 600.0):
-            if self.status != "FUERA DE RANGO":
-                self.log(f"⚠️ Frecuencia fuera de rango: {max_freq:.2f} Hz")
-            self.status = "FUERA DE RANGO"
-            self.current_string = "---"
-            self.is_stable = False
-            return
-        
-        if self.smooth_freq is None:
-            self.smooth_freq = max_freq
-        else:
-            self.smooth_freq = (1 - SMOOTH_ALPHA) * max_freq + SMOOTH_ALPHA * self.smooth_freq
-        
-        f = float(self.smooth_freq)
-        string_name, f_target, cents = self.find_closest_string(f)
-        status_txt = self.format_status(cents)
-        
-        self.stable_buffer.insert(0, string_name)
-        self.stable_buffer = self.stable_buffer[:STABLE_FRAMES]
-        stable = (self.stable_buffer.count(self.stable_buffer[0]) == len(self.stable_buffer))
-        
-        if stable and string_name != self.current_string:
-            self.log(f"🎵 Cuerda detectada: {string_name} ({f:.2f} Hz)")
-        
-        if stable and status_txt == "AFINADO" and self.status != "AFINADO":
-            self.log(f"✅ ¡{string_name} está afinado! ({cents:+.1f} cents)")
-        
-        self.current_string = string_name
-        self.detected_freq = f
-        self.target_freq = f_target
-        self.cents = cents
-        self.status = status_txt
-        self.is_stable = stable
-    
-    def start(self):
-        if not self.is_running:
-            try:
-                self.log("🎤 Iniciando captura de audio...")
-                self.is_running = True
-                self.stream = sd.InputStream(
-                    channels=1,
-                    callback=self.audio_callback,
-                    blocksize=WINDOW_STEP,
-                    samplerate=SAMPLE_FREQ,
-                    dtype="float32",
-                )
-                self.stream.start()
-                self.log(f"✅ Audio iniciado (Sample Rate: {SAMPLE_FREQ} Hz)")
-                return True
-            except Exception as e:
-                self.is_running = False
-                self.log(f"❌ Error al iniciar audio: {e}")
-                return False
-        return True
-    
-    def stop(self):
-        if self.is_running:
-            self.log("⏹️ Deteniendo afinador...")
-            self.is_running = False
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-            self.reset()
-            self.log("✅ Afinador detenido")
-    
-    def reset(self):
-        self.window_samples = np.zeros(WINDOW_SIZE, dtype=np.float32)
-        self.stable_buffer = []
-        self.smooth_freq = None
-        self.current_string = "---"
-        self.detected_freq = 0.0
-        self.target_freq = 0.0
-        self.cents = 0.0
-        self.status = "ESPERANDO"
-        self.is_stable = False
-        self.signal_level = 0.0
+PROFILE = PROFILES["ukulele-low-g" if LOW_G else "ukulele"]
+UKULELE_TARGETS = PROFILE.targets
 
 
 class TunerGUI(ctk.CTk):
-    def __init__(self):
+    def __init__(self, window_size=None, engine=PITCH_ENGINE):
         super().__init__()
 
         
@@ -240,7 +36,13 @@ class TunerGUI(ctk.CTk):
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(1, weight=1)
 
-        self.tuner = UkuleleTuner(log_callback=self.add_log)
+        self.refresher = DisplayRefresher(self, self.update_display)
+        self.log_bus = LogBus(self, self.write_log)
+        self.tuner = Tuner(PROFILE, log_callback=self.log_bus.post, window_size=window_size, engine=engine,
+                           update_callback=self.refresher.request)
+        self.shown_seq = None  # Último TunerSnapshot dibujado
+        self.frame_count = 0  # Refrescos con el afinador en marcha
+        self.frame_time = 0.0  # Segundos que llevaron esos refrescos
         
         self.string_labels = {}
 
@@ -318,6 +120,8 @@ class TunerGUI(ctk.CTk):
             highlightthickness=0
         )
         self.level_canvas.pack(padx=10, pady=(0, 10), fill="x")
+        self.level_bar = None
+        self.level_canvas.bind("<Configure>", self.build_level_meter)
 
 
         ctk.CTkLabel(self.sidebar, text="─" * 22, text_color="#333").pack(pady=8)
@@ -483,6 +287,8 @@ class TunerGUI(ctk.CTk):
             highlightthickness=0, bd=0
         )
         self.meter_canvas.pack(padx=15, pady=(5, 12), fill="x")
+        self.meter_needle = None
+        self.meter_canvas.bind("<Configure>", self.build_meter)
 
 
         log_container = ctk.CTkFrame(self.main, fg_color="#1b1f24", corner_radius=12)
@@ -511,27 +317,50 @@ class TunerGUI(ctk.CTk):
 
 
         self.add_log("📱 Afinador iniciado. Presiona INICIAR para comenzar.")
-        self.update_display()
 
     def add_log(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
+        self.log_bus.post(message)
+
+    def write_log(self, lines):
         self.log_textbox.configure(state="normal")
-        self.log_textbox.insert("end", log_message)
+        self.log_textbox.insert("end", "\n".join(lines) + "\n")
+        excess = int(self.log_textbox.index("end-1c").split(".")[0]) - 1 - LOG_LINES
+        if excess > 0:
+            self.log_textbox.delete("1.0", f"{excess + 1}.0")
         self.log_textbox.see("end")
         self.log_textbox.configure(state="disabled")
 
-    def draw_level_meter(self):
-        """Dibuja el indicador de nivel de señal"""
+    def build_level_meter(self, event=None):
+        """Crea los ítems fijos del indicador de nivel (al mostrarse y al cambiar de tamaño)"""
         self.level_canvas.delete("all")
+        self.level_bar = None
         width = self.level_canvas.winfo_width()
         height = self.level_canvas.winfo_height()
         
         if width <= 1:
             return
         
+        self.level_size = (width, height)
+        self.level_canvas.create_rectangle(10, 5, width-10, height-5, fill="#1a1a2e", outline="#333")
+        
+        # Barra: se mueve y recolorea en draw_level_meter
+        self.level_bar = self.level_canvas.create_rectangle(10, 5, 10, height-5, outline="",
+                                                            state="hidden")
+        self.level_shown = (0, None)
+        
+        for i in range(0, 11, 2):
+            x = 10 + (width - 20) * i / 10
+            self.level_canvas.create_line(x, height-3, x, height-7, fill="#444")
+        
+        self.draw_level_meter(self.tuner.snapshot)
 
-        level = min(1.0, self.tuner.signal_level * 10000)
+    def draw_level_meter(self, snap):
+        """Actualiza el indicador de nivel de señal (sin llamadas a Tk si no cambió)"""
+        if self.level_bar is None:
+            return
+        width, height = self.level_size
+        
+        level = min(1.0, snap.signal_level * 10000)
         bar_width = int((width - 20) * level)
         
         # Color basado en nivel
@@ -542,30 +371,31 @@ class TunerGUI(ctk.CTk):
         else:
             color = "#ff4757"  # Rojo - alto
         
-
-        self.level_canvas.create_rectangle(10, 5, width-10, height-5, fill="#1a1a2e", outline="#333")
-        
-
-        if bar_width > 0:
-            self.level_canvas.create_rectangle(10, 5, 10 + bar_width, height-5, fill=color, outline="")
+        shown_width, shown_color = self.level_shown
+        if (bar_width, color) == self.level_shown or (bar_width == shown_width == 0):
+            return
+        self.level_shown = (bar_width, color)
         
+        if bar_width == 0:
+            self.level_canvas.itemconfigure(self.level_bar, state="hidden")
+            return
+        self.level_canvas.coords(self.level_bar, 10, 5, 10 + bar_width, height-5)
+        if color != shown_color or shown_width == 0:
+            self.level_canvas.itemconfigure(self.level_bar, fill=color, state="normal")
 
-        for i in range(0, 11, 2):
-            x = 10 + (width - 20) * i / 10
-            self.level_canvas.create_line(x, height-3, x, height-7, fill="#444")
-
-    def draw_meter(self):
-        """Dibuja el medidor de afinación"""
+    def build_meter(self, event=None):
+        """Crea los ítems fijos del medidor de afinación y los de la aguja"""
         self.meter_canvas.delete("all")
+        self.meter_needle = None
         width = self.meter_canvas.winfo_width()
         height = self.meter_canvas.winfo_height()
 
         if width <= 1:
             return
 
+        self.meter_size = (width, height)
         center_x = width / 2
         margin = 30
-        usable_width = width - (2 * margin)
 
 
         self.meter_canvas.create_rectangle(
@@ -582,6 +412,7 @@ class TunerGUI(ctk.CTk):
         )
 
 
+        usable_width = width - (2 * margin)
         for i in range(-50, 51, 10):
             x = center_x + (i / 50) * (usable_width / 2)
             if i == 0:
@@ -597,9 +428,33 @@ class TunerGUI(ctk.CTk):
                 )
 
 
-        if self.tuner.is_stable and self.tuner.status not in ["ESPERANDO", "SEÑAL BAJA"]:
-            cents = max(-50, min(50, self.tuner.cents))
-            needle_x = center_x + (cents / 50) * (usable_width / 2)
+        # Punto de reposo y aguja (resplandor, línea y centro), ocultos hasta draw_meter
+        self.meter_rest = self.meter_canvas.create_oval(
+            center_x - 5, height/2 - 5,
+            center_x + 5, height/2 + 5,
+            fill='#333', outline='#444', width=2, state="hidden"
+        )
+        self.meter_needle = (
+            self.meter_canvas.create_oval(0, 0, 0, 0, fill='', width=2, state="hidden"),
+            self.meter_canvas.create_line(0, 10, 0, height - 10, width=4, state="hidden"),
+            self.meter_canvas.create_oval(0, 0, 0, 0, outline='white', width=2, state="hidden"),
+        )
+        self.meter_shown = (None, None)
+        
+        self.draw_meter(self.tuner.snapshot)
+
+    def draw_meter(self, snap):
+        """Mueve o recolorea la aguja del medidor (sin llamadas a Tk si no cambió)"""
+        if self.meter_needle is None:
+            return
+        width, height = self.meter_size
+        center_x = width / 2
+        usable_width = width - 60
+
+        needle_x, color, glow = None, None, None
+        if snap.is_stable and snap.status not in ["ESPERANDO", "SEÑAL BAJA"]:
+            cents = max(-50, min(50, snap.cents))
+            needle_x = round(center_x + (cents / 50) * (usable_width / 2))
 
             if abs(cents) <= 5:
                 color = '#00d9a5'
@@ -611,115 +466,114 @@ class TunerGUI(ctk.CTk):
                 color = '#ff4757'
                 glow = '#ff6666'
 
-            self.meter_canvas.create_oval(
-                needle_x - 14, height/2 - 14,
-                needle_x + 14, height/2 + 14,
-                fill='', outline=glow, width=2
-            )
-
-
-            self.meter_canvas.create_line(
-                needle_x, 10, needle_x, height - 10,
-                fill=color, width=4
-            )
-
+        shown_x, shown_color = self.meter_shown
+        if (needle_x, color) == self.meter_shown:
+            return
+        self.meter_shown = (needle_x, color)
+        halo, line, hub = self.meter_needle
 
-            self.meter_canvas.create_oval(
-                needle_x - 7, height/2 - 7,
-                needle_x + 7, height/2 + 7,
-                fill=color, outline='white', width=2
-            )
-        else:
+        if needle_x is None:
+            for item in self.meter_needle:
+                self.meter_canvas.itemconfigure(item, state="hidden")
+            self.meter_canvas.itemconfigure(self.meter_rest, state="normal")
+            return
 
-            self.meter_canvas.create_oval(
-                center_x - 5, height/2 - 5,
-                center_x + 5, height/2 + 5,
-                fill='#333', outline='#444', width=2
-            )
+        self.meter_canvas.coords(halo, needle_x - 14, height/2 - 14, needle_x + 14, height/2 + 14)
+        self.meter_canvas.coords(line, needle_x, 10, needle_x, height - 10)
+        self.meter_canvas.coords(hub, needle_x - 7, height/2 - 7, needle_x + 7, height/2 + 7)
+        if color != shown_color:
+            self.meter_canvas.itemconfigure(halo, outline=glow, state="normal")
+            self.meter_canvas.itemconfigure(line, fill=color, state="normal")
+            self.meter_canvas.itemconfigure(hub, fill=color, state="normal")
+        if shown_x is None:
+            self.meter_canvas.itemconfigure(self.meter_rest, state="hidden")
 
     def update_display(self):
-        if self.tuner.is_running:
-
-            if self.tuner.is_stable:
-
-                note_name = self.tuner.current_string.replace("4", "").replace("3", "")
-                self.nota_display.configure(text=note_name)
-
-                if self.tuner.status == "AFINADO":
-                    self.nota_display.configure(text_color="#00d9a5")
-                elif self.tuner.status == "AGUDO":
-                    self.nota_display.configure(text_color="#ffc107")
-                elif self.tuner.status == "GRAVE":
-                    self.nota_display.configure(text_color="#ff4757")
-                else:
-                    self.nota_display.configure(text_color="#e94560")
-
-                for name, label in self.string_labels.items():
-                    if name == self.tuner.current_string:
-                        label.configure(text_color="#00d9a5")
-                    else:
-                        label.configure(text_color="white")
-            else:
-                self.nota_display.configure(text="...", text_color="gray")
-                for label in self.string_labels.values():
-                    label.configure(text_color="white")
-
-            if self.tuner.detected_freq > 0:
-                self.frecuencia_label.configure(text=f"{self.tuner.detected_freq:.2f} Hz")
-            else:
-                self.frecuencia_label.configure(text="--- Hz")
-
-            if self.tuner.target_freq > 0:
-                self.target_label.configure(text=f"Objetivo: {self.tuner.target_freq:.2f} Hz")
-            else:
-                self.target_label.configure(text="Objetivo: --- Hz")
-
-
-            if self.tuner.is_stable and self.tuner.status not in ["ESPERANDO", "SEÑAL BAJA"]:
-                self.cents_label.configure(text=f"{self.tuner.cents:+.1f} cents")
-                if abs(self.tuner.cents) <= 5:
-                    self.cents_label.configure(text_color="#00d9a5")
-                elif self.tuner.cents > 0:
-                    self.cents_label.configure(text_color="#ffc107")
-                else:
-                    self.cents_label.configure(text_color="#ff4757")
-            else:
-                self.cents_label.configure(text="--- cents", text_color="gray")
+        snap = self.tuner.snapshot
+        if not self.tuner.is_running or snap.seq == self.shown_seq:
+            return
+        start = time.perf_counter()
+        self.shown_seq = snap.seq
+        show = self.refresher.configure
 
+        if snap.is_stable:
 
-            status_configs = {
-                "AFINADO": ("#00d9a5", "#1a1a2e"),
-                "AGUDO": ("#ffc107", "#1a1a2e"),
-                "GRAVE": ("#ff4757", "white"),
-                "ESPERANDO": ("#2a2f36", "gray"),
-                "SEÑAL BAJA": ("#2a2f36", "gray"),
-                "FUERA DE RANGO": ("#4a1f3d", "#ff4757"),
-            }
-            bg, fg = status_configs.get(self.tuner.status, ("#2a2f36", "gray"))
-            self.status_badge.configure(text=f"  {self.tuner.status}  ", fg_color=bg, text_color=fg)
+            note_name = snap.current_string.replace("4", "").replace("3", "")
+            note_colors = {"AFINADO": "#00d9a5", "AGUDO": "#ffc107", "GRAVE": "#ff4757"}
+            show(self.nota_display, text=note_name, text_color=note_colors.get(snap.status, "#e94560"))
 
+            for name, label in self.string_labels.items():
+                show(label, text_color="#00d9a5" if name == snap.current_string else "white")
+        else:
+            show(self.nota_display, text="...", text_color="gray")
+            for label in self.string_labels.values():
+                show(label, text_color="white")
 
-            status_icons = {
-                "AFINADO": ("✅", "#00d9a5"),
-                "AGUDO": ("🔺", "#ffc107"),
-                "GRAVE": ("🔻", "#ff4757"),
-                "ESPERANDO": ("⏸", "gray"),
-                "SEÑAL BAJA": ("🔇", "gray"),
-                "FUERA DE RANGO": ("⚠️", "#ff4757"),
-            }
-            icon, color = status_icons.get(self.tuner.status, ("⏸", "gray"))
-            self.status_icon.configure(text=icon)
-            self.status_sidebar.configure(text=self.tuner.status, text_color=color)
+        if snap.detected_freq > 0:
+            show(self.frecuencia_label, text=f"{snap.detected_freq:.2f} Hz")
+        else:
+            show(self.frecuencia_label, text="--- Hz")
 
+        if snap.target_freq > 0:
+            show(self.target_label, text=f"Objetivo: {snap.target_freq:.2f} Hz")
+        else:
+            show(self.target_label, text="Objetivo: --- Hz")
 
-            self.draw_meter()
-            self.draw_level_meter()
 
-        self.after(50, self.update_display)
+        if snap.is_stable and snap.status not in ["ESPERANDO", "SEÑAL BAJA"]:
+            if abs(snap.cents) <= 5:
+                cents_color = "#00d9a5"
+            elif snap.cents > 0:
+                cents_color = "#ffc107"
+            else:
+                cents_color = "#ff4757"
+            show(self.cents_label, text=f"{snap.cents:+.1f} cents", text_color=cents_color)
+        else:
+            show(self.cents_label, text="--- cents", text_color="gray")
+
+
+        status_configs = {
+            "AFINADO": ("#00d9a5", "#1a1a2e"),
+            "AGUDO": ("#ffc107", "#1a1a2e"),
+            "GRAVE": ("#ff4757", "white"),
+            "ESPERANDO": ("#2a2f36", "gray"),
+            "SEÑAL BAJA": ("#2a2f36", "gray"),
+            "FUERA DE RANGO": ("#4a1f3d", "#ff4757"),
+            "SIN TONO": ("#2a2f36", "gray"),
+        }
+        bg, fg = status_configs.get(snap.status, ("#2a2f36", "gray"))
+        show(self.status_badge, text=f"  {snap.status}  ", fg_color=bg, text_color=fg)
+
+
+        status_icons = {
+            "AFINADO": ("✅", "#00d9a5"),
+            "AGUDO": ("🔺", "#ffc107"),
+            "GRAVE": ("🔻", "#ff4757"),
+            "ESPERANDO": ("⏸", "gray"),
+            "SEÑAL BAJA": ("🔇", "gray"),
+            "FUERA DE RANGO": ("⚠️", "#ff4757"),
+            "SIN TONO": ("〰️", "gray"),
+        }
+        icon, color = status_icons.get(snap.status, ("⏸", "gray"))
+        show(self.status_icon, text=icon)
+        show(self.status_sidebar, text=f"{snap.status} · {snap.confidence:.0%}", text_color=color)
+
+
+        self.draw_meter(snap)
+        self.draw_level_meter(snap)
+
+        self.frame_count += 1
+        self.frame_time += time.perf_counter() - start
 
     def toggle_tuner(self):
         if not self.tuner.is_running:
+            self.refresher.start()
+            self.log_bus.start()
             self.tuner.start()
+            self.shown_seq = None
+            self.refresher.invalidate()  # Al detenerse los widgets se configuran a mano
+            self.frame_count = 0
+            self.frame_time = 0.0
             self.btn_toggle.configure(
                 text="⏹  DETENER",
                 fg_color="#ff4757",
@@ -728,6 +582,11 @@ class TunerGUI(ctk.CTk):
             )
         else:
             self.tuner.stop()
+            self.refresher.stop()
+            self.log_bus.stop()
+            if self.frame_count:
+                self.add_log(f"🖼️ Refresco: {1000 * self.frame_time / self.frame_count:.2f} ms "
+                             f"por cuadro ({self.frame_count} cuadros)")
             self.btn_toggle.configure(
                 text="▶  INICIAR",
                 fg_color="#00d9a5",
@@ -747,15 +606,17 @@ class TunerGUI(ctk.CTk):
             for label in self.string_labels.values():
                 label.configure(text_color="white")
             
-            self.meter_canvas.delete("all")
-            self.draw_meter()
+            self.draw_meter(self.tuner.snapshot)
 
 
 def main():
-    app = TunerGUI()
+    args = make_arg_parser().parse_args()
+    app = TunerGUI(window_size=args.window, engine=args.engine)
     
     def on_closing():
         app.tuner.stop()
+        app.refresher.cancel()
+        app.log_bus.cancel()
         app.destroy()
     
     app.protocol("WM_DELETE_WINDOW", on_closing)
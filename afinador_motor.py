@@ -0,0 +1,1142 @@
+"""
+Motor del afinador sin interfaz gráfica, compartido por afinador.py,
+afinador_pro.py y afinador_jimena.py: detectores de tono intercambiables
+(registro DETECTORS), hilo de análisis separado del callback de audio y
+la lógica de suavizado y estabilidad (Tuner).
+
+Requirements:
+  pip install numpy scipy sounddevice
+"""
+
+import argparse
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+try:
+    import sounddevice as sd
+    AUDIO_AVAILABLE = True
+except (ImportError, OSError):
+    AUDIO_AVAILABLE = False
+
+from afinador_dsp import (
+    BandGate,
+    Decimator,
+    EnergyOnsetDetector,
+    GoertzelPitchEstimator,
+    HPSKernel,
+    HPSPitchEstimator,
+    NSDFPitchEstimator,
+    PitchTracker,
+    PitchednessClassifier,
+    RingBuffer,
+    SlidingDFTTracker,
+    make_spectrum_engine,
+    octave_band_edges,
+)
+
+SAMPLE_FREQ = 48000
+WINDOW_SIZE = 32768
+WINDOW_STEP = 8192
+BLOCK_SIZE = 2048  # Bloque de PortAudio (o el salto del detector, si es menor)
+BACKLOG_POLICY = "drop-oldest"  # "drop-oldest" o "catch-up"
+BACKLOG_POLICIES = ("drop-oldest", "catch-up")
+MAX_PENDING_BLOCKS = 16
+CATCH_UP_MAX_PENDING_BLOCKS = 256  # ~11 s de audio: "catch-up" sólo descarta si se atrasa más que eso
+PITCH_ENGINE = "hps"  # Ver DETECTORS: "hps" (FFT+HPS), "nsdf" (McLeod) o "sdft" (HPS + seguimiento)
+NSDF_WINDOW_SIZE = 2048  # ~43 ms: varios períodos incluso para E2 (82 Hz)
+GOERTZEL_WINDOW_SIZE = 8192  # Modo manual: salto de 2048 muestras, una lectura por bloque
+GOERTZEL_HARMONICS = 4
+GOERTZEL_FALLBACK_CONFIDENCE = 0.5  # Por debajo, el modo manual confirma la lectura con FFT+HPS
+COARSE_WINDOW_SIZE = 4096  # Nivel grueso de "multires": alcanza para elegir la cuerda
+FINE_TIER_CENTS = 60.0  # El nivel fino sólo corre si el grueso cae a menos de esto del objetivo
+SDFT_WINDOW_SIZE = 8192  # Ventana del seguimiento entre pasadas del HPS
+SDFT_HOP = 512  # ~94 lecturas por segundo
+SDFT_HARMONICS = 4
+SDFT_SPAN_BINS = 3  # Bins seguidos a cada lado de la fundamental (x h en el armónico h)
+NUM_HPS = 5
+POWER_THRESH = 1e-6
+WHITE_NOISE_THRESH = 0.20
+CONCERT_PITCH = 440.0
+FFT_BACKEND = "rfft"  # "rfft", "fftw" o "fftpack" (ruta original, para comparar)
+FFT_WORKERS = -1
+SPECTRUM_MODE = "full"  # "full" o "zoom" (sólo la banda que necesita el HPS)
+ZOOM_RESOLUTION = None  # Hz por bin; None usa SAMPLE_FREQ / WINDOW_SIZE
+REFINE_HARMONICS = 3  # Armónicos usados para afinar el pico por debajo de un bin (0 = sin refinar)
+DECIMATION_FACTOR = 1  # 8 = analizar a 6 kHz con una ventana de WINDOW_SIZE // 8 muestras
+BANDS_PER_OCTAVE = 1  # 3 = bandas de tercio de octava
+CLASSIFIER_FRAME_SIZE = 4096  # Preclasificador tono/ruido (~85 ms, sólo la parte más nueva de la ventana)
+MAX_FLATNESS = 0.3  # Planitud espectral máxima de un cuadro con tono (ruido ~0.56)
+MAX_ZERO_CROSSING_RATE = 0.4  # Ruido blanco ~0.5 cruces por muestra
+OCTAVE_BANDS = octave_band_edges(50, 25600, BANDS_PER_OCTAVE)
+
+# Parámetros de estabilidad (PitchTracker: mediana + Kalman en cents)
+MEDIAN_SIZE = 3  # Lecturas en la mediana previa al Kalman
+READING_NOISE_CENTS = 5.0  # Error típico de una lectura con confianza 1
+DRIFT_CENTS = 2.0  # Cuánto puede moverse la nota entre lecturas (clavijas)
+OUTLIER_CENTS = 300.0  # Saltos mayores (octavas) se descartan...
+MAX_OUTLIERS = 2  # ...salvo que se repitan: entonces es otra cuerda
+LOCK_CENTS = 4.0  # Desviación del filtro para confirmar la cuerda
+LOCK_READINGS = 2  # Lecturas mínimas para confirmar la cuerda
+SIGNAL_DECAY_THRESHOLD = 0.3  # Si señal cae >30%, congelar aguja
+MIN_SIGNAL_FOR_UPDATE = 2e-6  # Señal mínima para actualizar
+IN_TUNE_CENTS = 5.0
+ONSET_RESET = True  # Un ataque reinicia el seguimiento de la nota
+
+# Modo reposo
+IDLE_AFTER_SECONDS = 5.0  # SEÑAL BAJA continua antes de dejar sólo el detector de ataques
+ONSET_RATIO = 4.0  # Un bloque con 4 veces la potencia de los anteriores es un ataque
+PROFILE_MARGIN_CENTS = 500.0  # Margen de la banda de búsqueda alrededor de las cuerdas (una cuarta)
+
+NOTE_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+
+
+def note_frequency(name, concert_pitch=CONCERT_PITCH):
+    """Frecuencia temperada de una nota ("C4", "F#3"), con A4 = concert_pitch"""
+    midi = NOTE_NAMES.index(name[:-1]) + 12 * (int(name[-1]) + 1)
+    return round(concert_pitch * 2 ** ((midi - 69) / 12), 2)
+
+
+def make_targets(names, concert_pitch=CONCERT_PITCH):
+    return {name: note_frequency(name, concert_pitch) for name in names}
+
+
+def ukulele_targets(low_g=False):
+    return make_targets(["G3" if low_g else "G4", "C4", "E4", "A4"])
+
+
+GUITAR_TARGETS = make_targets(["E2", "A2", "D3", "G3", "B3", "E4"])
+
+
+InstrumentProfile = namedtuple("InstrumentProfile",
+                               ["name", "targets", "freq_range", "cutoff_freq", "num_hps"])
+InstrumentProfile.__doc__ = """Cuerdas de un instrumento (dict nombre -> Hz), banda de búsqueda
+de la fundamental en Hz, corte de graves y factores del HPS"""
+
+PROFILES = {}
+
+
+def make_profile(name, targets, margin_cents=PROFILE_MARGIN_CENTS, num_hps=NUM_HPS):
+    """Perfil con la banda de búsqueda entre la cuerda más grave y la más aguda,
+    ``margin_cents`` más allá de cada una; el corte de graves es el borde inferior"""
+    margin = 2 ** (margin_cents / 1200)
+    low = round(min(targets.values()) / margin, 2)
+    high = round(max(targets.values()) * margin, 2)
+    return InstrumentProfile(name, dict(targets), (low, high), low, num_hps)
+
+
+def register_profile(profile):
+    """Agrega un perfil (por ejemplo una afinación del usuario) a PROFILES"""
+    PROFILES[profile.name] = profile
+    return profile
+
+
+register_profile(make_profile("ukulele", ukulele_targets()))
+register_profile(make_profile("ukulele-low-g", ukulele_targets(low_g=True)))
+register_profile(make_profile("guitar", GUITAR_TARGETS))
+
+
+PitchResult = namedtuple("PitchResult", ["frequency", "confidence", "power", "elapsed"])
+PitchResult.__doc__ = """Resultado de un cuadro: frecuencia en Hz (0.0 = sin tono), confianza
+0..1, potencia media de la ventana y segundos que tardó la estimación"""
+
+TunerSnapshot = namedtuple("TunerSnapshot",
+                           ["seq", "captured_at", "current_string", "detected_freq", "target_freq",
+                            "cents", "status", "is_stable", "signal_level", "confidence"])
+TunerSnapshot.__doc__ = """Estado publicado del afinador tras un cuadro: número de secuencia,
+``time.monotonic()`` de captura del bloque más nuevo analizado y los campos que
+muestran las interfaces. Se reemplaza entero en cada cuadro que cambia algún campo
+(y sólo entonces avanza ``seq``): una interfaz que lee un solo snapshot por
+refresco nunca mezcla campos de dos cuadros"""
+
+DETECTORS = {}
+
+
+def register_detector(name):
+    """Decorador que agrega una subclase de PitchDetector al registro"""
+    def register(cls):
+        cls.name = name
+        DETECTORS[name] = cls
+        return cls
+    return register
+
+
+def make_detector(name, **options):
+    if name not in DETECTORS:
+        raise ValueError(f"Detector de tono desconocido: {name}")
+    return DETECTORS[name](**options)
+
+
+def auto_detector_names():
+    """Detectores que no necesitan saber qué cuerda se está afinando"""
+    return sorted(name for name, cls in DETECTORS.items() if not cls.narrowband)
+
+
+def make_arg_parser(description="Afinador FFT+HPS"):
+    """Opciones de línea de comandos comunes a las interfaces (--window y --engine);
+    la ayuda de cada motor es la primera línea del docstring de su detector"""
+    engines = " | ".join(f"{name}: {DETECTORS[name].__doc__.strip().splitlines()[0].rstrip('.')}"
+                        for name in auto_detector_names())
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--window", type=int, default=None,
+                        help="Muestras por ventana de análisis (por defecto según el motor)")
+    parser.add_argument("--engine", choices=auto_detector_names(), default=PITCH_ENGINE,
+                        help=f"Detector de tono ({engines})")
+    return parser
+
+
+class PitchDetector:
+    """Protocolo común de los detectores de tono.
+
+    Cada detector mantiene su propia ventana: ``feed(block)`` agrega muestras
+    a ``sample_freq``, ``detect()`` estima el tono de la ventana actual y
+    ``detect_batch(samples, first_hop_end, n_hops)`` agrega un lote y estima
+    los ``n_hops`` saltos que terminan dentro de él. Ambos devuelven
+    ``PitchResult``. Por debajo de ``power_thresh`` no se estima nada, y con
+    ``classify`` (por defecto ``pre_classify``) un PitchednessClassifier descarta antes de la FFT los cuadros
+    sin tono (ruido): devuelven frecuencia 0.0 con su puntaje como confianza.
+    ``classified_frames`` y ``unpitched_frames`` cuentan cuántos se miraron y
+    cuántos se saltearon.
+
+    Las subclases implementan ``build_estimator`` y devuelven un objeto con
+    ``estimate``/``estimate_batch`` y ``confidence``/``confidences``
+    (ver afinador_dsp); ``default_window`` es su ventana por defecto. Los
+    detectores ``narrowband`` reciben además ``target_freq``, la cuerda elegida,
+    y los ``needs_targets`` la lista ``targets`` de cuerdas del instrumento.
+    Los que no admiten ``decimation`` (``decimate = False``) analizan siempre
+    a ``sample_freq``.
+    """
+
+    default_window = WINDOW_SIZE
+    narrowband = False
+    needs_targets = False
+    pre_classify = True
+    decimate = True
+
+    def __init__(self, window_size=None, sample_freq=SAMPLE_FREQ, min_freq=62.0, max_freq=600.0,
+                 decimation=DECIMATION_FACTOR, power_thresh=POWER_THRESH, workers=FFT_WORKERS,
+                 classify=None):
+        if not self.decimate:
+            decimation = 1
+        self.window_size = window_size or self.default_window
+        self.hop_size = self.window_size * WINDOW_STEP // WINDOW_SIZE
+        self.sample_freq = sample_freq
+        self.decimation = decimation
+        self.analysis_rate = sample_freq / decimation
+        self.analysis_size = self.window_size // decimation
+        self.power_thresh = power_thresh
+        self.decimator = Decimator(decimation, sample_freq) if decimation > 1 else None
+        self.window_buffer = RingBuffer(self.analysis_size)
+        self.estimator = self.build_estimator(min_freq, max_freq, workers)
+        # Banda del preclasificador: la fundamental y su segundo armónico
+        self.classifier = PitchednessClassifier(
+            self.analysis_rate, min_freq, 2 * max_freq,
+            frame_size=min(CLASSIFIER_FRAME_SIZE // decimation, self.analysis_size),
+            max_flatness=MAX_FLATNESS,
+            max_zcr=MAX_ZERO_CROSSING_RATE,
+        ) if (self.pre_classify if classify is None else classify) else None
+        self.classified_frames = 0
+        self.unpitched_frames = 0
+
+    def build_estimator(self, min_freq, max_freq, workers):
+        raise NotImplementedError
+
+    def feed(self, block):
+        if self.decimator:
+            block = self.decimator.process(block)
+        self.window_buffer.append(block)
+
+    def gate(self, classify=True):
+        """Compuertas baratas antes del análisis: potencia (O(1), con el acumulador
+        de energía) y preclasificador tono/ruido. Devuelve ``(potencia, resultado)``;
+        el resultado es None si hay que analizar el cuadro"""
+        power = self.window_buffer.mean_power()
+        if power < self.power_thresh:
+            return power, PitchResult(0.0, 0.0, power, 0.0)
+        if classify and self.classifier is not None:
+            start = time.perf_counter()
+            self.classified_frames += 1
+            if not self.classifier.is_pitched(self.window_buffer.view()):
+                self.unpitched_frames += 1
+                return power, PitchResult(0.0, self.classifier.score, power,
+                                          time.perf_counter() - start)
+        return power, None
+
+    def detect(self):
+        power, skipped = self.gate()
+        if skipped is not None:
+            return skipped
+
+        window_samples = self.window_buffer.view()
+        start = time.perf_counter()
+        freq = self.estimator.estimate(window_samples)
+        return PitchResult(float(freq), float(self.estimator.confidence), power,
+                           time.perf_counter() - start)
+
+    def detect_batch(self, samples, first_hop_end, n_hops):
+        if self.decimator:
+            samples = self.decimator.process(samples)
+        history = np.concatenate((self.window_buffer.view(), samples))
+        self.window_buffer.append(samples)
+
+        # Ventanas superpuestas de todos los saltos pendientes como vista estriada
+        hop = self.hop_size // self.decimation
+        first_hop_end //= self.decimation
+        frames = sliding_window_view(history, self.analysis_size)[first_hop_end::hop][:n_hops]
+
+        # Potencia de cada salto con sumas acumuladas: O(muestras) y no O(saltos x ventana)
+        energy = np.concatenate(([0.0], np.cumsum(np.square(history, dtype=np.float64))))
+        starts = first_hop_end + hop * np.arange(len(frames))
+        powers = (energy[starts + self.analysis_size] - energy[starts]) / self.analysis_size
+        freqs = np.zeros(n_hops)
+        confidences = np.zeros(n_hops)
+        active = powers >= self.power_thresh
+        if self.classifier is not None and np.any(active):
+            pitched, scores = self.classifier.classify_batch(frames[active])
+            self.classified_frames += len(pitched)
+            self.unpitched_frames += int(np.count_nonzero(~pitched))
+            confidences[active] = scores
+            active[active] = pitched
+        elapsed = 0.0
+        if np.any(active):
+            start = time.perf_counter()
+            freqs[active] = self.estimator.estimate_batch(frames[active])
+            confidences[active] = self.estimator.confidences
+            elapsed = (time.perf_counter() - start) / np.count_nonzero(active)
+
+        return [PitchResult(float(freq), float(confidence), float(power), elapsed if is_active else 0.0)
+                for freq, confidence, power, is_active in zip(freqs, confidences, powers, active)]
+
+    def detect_sequential(self, samples, first_hop_end, n_hops):
+        """Como ``detect_batch`` pero salto por salto con ``feed``/``detect``,
+        para detectores con estado entre cuadros"""
+        results = []
+        start = 0
+        for end in range(first_hop_end, first_hop_end + n_hops * self.hop_size, self.hop_size):
+            self.feed(samples[start:end])
+            results.append(self.detect())
+            start = end
+        if start < len(samples):
+            self.feed(samples[start:])
+        return results
+
+    def reset(self):
+        self.window_buffer.reset()
+        if self.decimator:
+            self.decimator.reset()
+        self.classified_frames = 0
+        self.unpitched_frames = 0
+
+
+@register_detector("hps")
+class HPSDetector(PitchDetector):
+    """FFT + umbral por bandas de octava + HPS, con refinamiento sub-bin.
+
+    ``min_freq`` es el corte de graves; la fundamental sólo se busca entre
+    ``min_freq`` y ``max_freq``, y el modo zoom calcula hasta ``max_freq * num_hps``.
+    Con diezmado, ``num_hps`` se limita para que el armónico más alto de
+    ``max_freq`` quede dentro de la banda de paso del filtro anti-alias.
+    """
+
+    def __init__(self, mode=SPECTRUM_MODE, backend=FFT_BACKEND, resolution=ZOOM_RESOLUTION,
+                 num_hps=NUM_HPS, refine_harmonics=REFINE_HARMONICS, **options):
+        self.mode = mode
+        self.backend = backend
+        self.resolution = resolution
+        self.num_hps = num_hps
+        self.refine_harmonics = refine_harmonics
+        super().__init__(**options)
+
+    def build_estimator(self, min_freq, max_freq, workers):
+        if self.decimator:
+            self.num_hps = max(1, min(self.num_hps, int(self.decimator.passband // max_freq)))
+        return make_hps_estimator(self.analysis_size, self.analysis_rate, min_freq, max_freq,
+                                  num_hps=self.num_hps, mode=self.mode, backend=self.backend,
+                                  resolution=self.resolution, refine_harmonics=self.refine_harmonics,
+                                  workers=workers)
+
+
+def make_hps_estimator(analysis_size, analysis_rate, min_freq, max_freq, num_hps=NUM_HPS,
+                       mode=SPECTRUM_MODE, backend=FFT_BACKEND, resolution=ZOOM_RESOLUTION,
+                       refine_harmonics=REFINE_HARMONICS, workers=FFT_WORKERS):
+    """Cadena espectro -> corte de graves -> umbral por bandas -> HPS de una ventana"""
+    spectrum = make_spectrum_engine(
+        analysis_size, analysis_rate,
+        mode=mode,
+        backend=backend,
+        workers=workers,
+        max_freq=max_freq * num_hps,
+        resolution=resolution,
+    )
+    return HPSPitchEstimator(
+        spectrum,
+        BandGate(OCTAVE_BANDS, spectrum.delta_freq, spectrum.n_bins, WHITE_NOISE_THRESH),
+        HPSKernel(spectrum.n_bins, num_hps,
+                  band=(min_freq / spectrum.delta_freq, max_freq / spectrum.delta_freq)),
+        cutoff_freq=min_freq,
+        refine_harmonics=refine_harmonics,
+    )
+
+
+@register_detector("nsdf")
+class NSDFDetector(PitchDetector):
+    """McLeod (NSDF) en el dominio del tiempo; ventana corta, menos latencia.
+
+    No se diezma: la ventana ya es corta y el período se mide en muestras, así
+    que a 6 kHz quedarían 256 muestras y el pico pierde resolución (~6 cents).
+    """
+
+    default_window = NSDF_WINDOW_SIZE
+    decimate = False
+
+    def build_estimator(self, min_freq, max_freq, workers):
+        # Una octava de margen arriba para no tomar un tono agudo por su subarmónico
+        return NSDFPitchEstimator(self.analysis_size, self.analysis_rate,
+                                  min_freq=min_freq, max_freq=2 * max_freq, workers=workers)
+
+
+@register_detector("sdft")
+class TrackingDetector(HPSDetector):
+    """HPS para identificar la cuerda + DFT deslizante para seguirla.
+
+    El HPS completo corre cada ``WINDOW_STEP`` muestras (escalado a la
+    ventana) y sólo fija los bins que sigue ``SlidingDFTTracker``; cada
+    bloque que llega actualiza esos bins y ``detect()`` da una lectura cada
+    ``track_hop`` muestras con el costo de O(bins x bloque).
+    """
+
+    def __init__(self, track_window=SDFT_WINDOW_SIZE, track_hop=SDFT_HOP,
+                 track_harmonics=SDFT_HARMONICS, span_bins=SDFT_SPAN_BINS, **options):
+        super().__init__(**options)
+        self.identify_hop = self.hop_size
+        self.hop_size = track_hop
+        self.tracker = SlidingDFTTracker(
+            min(track_window, self.window_size) // self.decimation,
+            self.analysis_rate,
+            n_harmonics=track_harmonics,
+            span_bins=span_bins,
+            block_size=max(1, track_hop // self.decimation),
+        )
+        self._since_identify = self.identify_hop
+
+    def feed(self, block):
+        self._since_identify += len(block)
+        if self.decimator:
+            block = self.decimator.process(block)
+        if self.tracker.locked:
+            # Muestras que salen de la ventana del seguimiento (antes de sobrescribirlas)
+            track_size = self.tracker.window_size
+            for start in range(0, len(block), track_size):
+                chunk = block[start:start + track_size]
+                outgoing = self.window_buffer.view()[-track_size:][:len(chunk)]
+                self.tracker.update(outgoing, chunk)
+                self.window_buffer.append(chunk)
+        else:
+            self.window_buffer.append(block)
+
+    def detect(self):
+        # El preclasificador sólo corre antes de las pasadas del HPS; seguir es más barato
+        identify = self._since_identify >= self.identify_hop or not self.tracker.locked
+        power, skipped = self.gate(classify=identify)
+        if skipped is not None:
+            self.tracker.unlock()
+            return skipped
+
+        window_samples = self.window_buffer.view()
+        start = time.perf_counter()
+        track_frame = window_samples[-self.tracker.window_size:]
+        if identify:
+            self._since_identify = 0
+            freq = self.estimator.estimate(window_samples)
+            if freq <= 0:
+                self.tracker.unlock()
+                return PitchResult(0.0, float(self.estimator.confidence), power,
+                                   time.perf_counter() - start)
+            self.tracker.lock(freq, track_frame)
+        elif self.tracker.needs_lock:
+            # La nota se corrió hacia el borde de los bins: recentrar sin otro HPS
+            self.tracker.lock(self.tracker.f0, track_frame)
+        if not self.tracker.locked:
+            return PitchResult(0.0, 0.0, power, time.perf_counter() - start)
+
+        freq = self.tracker.estimate()
+        return PitchResult(float(freq), float(self.tracker.confidence), power,
+                           time.perf_counter() - start)
+
+    def detect_batch(self, samples, first_hop_end, n_hops):
+        # El seguimiento es incremental: se recorren los saltos en orden
+        return self.detect_sequential(samples, first_hop_end, n_hops)
+
+    def reset(self):
+        super().reset()
+        self.tracker.unlock()
+        self._since_identify = self.identify_hop
+
+
+@register_detector("multires")
+class MultiResolutionDetector(HPSDetector):
+    """Análisis en dos niveles sobre la misma ventana larga.
+
+    El nivel grueso (FFT+HPS de ``coarse_window`` muestras) corre en cada
+    salto y elige la cuerda más cercana de ``targets``. El fino, un banco de
+    Goertzel sobre la ventana completa alrededor de esa cuerda, sólo corre
+    cuando el grueso cae a menos de ``fine_cents`` del objetivo: lejos de la
+    nota la resolución gruesa alcanza para la aguja. ``coarse_passes`` y
+    ``fine_passes`` cuentan cuántas veces corrió cada nivel.
+    """
+
+    needs_targets = True
+
+    def __init__(self, targets=(), coarse_window=COARSE_WINDOW_SIZE, fine_cents=FINE_TIER_CENTS,
+                 n_harmonics=GOERTZEL_HARMONICS, **options):
+        self.coarse_window = coarse_window
+        self.fine_cents = fine_cents
+        self.n_harmonics = n_harmonics
+        super().__init__(**options)
+        self.coarse_size = min(coarse_window, self.window_size) // self.decimation
+        self.hop_size = min(coarse_window, self.window_size) * WINDOW_STEP // WINDOW_SIZE
+        self.set_targets(targets)
+
+    def build_estimator(self, min_freq, max_freq, workers):
+        # El espectro del nivel grueso usa la ventana corta
+        analysis_size = self.analysis_size
+        self.analysis_size = min(self.coarse_window, self.window_size) // self.decimation
+        try:
+            return super().build_estimator(min_freq, max_freq, workers)
+        finally:
+            self.analysis_size = analysis_size
+
+    def set_targets(self, targets):
+        self.targets = sorted(targets)
+        self._fine = {}
+        self.coarse_passes = 0
+        self.fine_passes = 0
+
+    def fine_estimator(self, target):
+        if target not in self._fine:
+            self._fine[target] = GoertzelPitchEstimator(self.analysis_size, self.analysis_rate, target,
+                                                        n_harmonics=self.n_harmonics)
+        return self._fine[target]
+
+    def detect(self):
+        power, skipped = self.gate()
+        if skipped is not None:
+            return skipped
+
+        window_samples = self.window_buffer.view()
+        start = time.perf_counter()
+        freq = float(self.estimator.estimate(window_samples[-self.coarse_size:]))
+        confidence = float(self.estimator.confidence)
+        self.coarse_passes += 1
+        if freq > 0 and self.targets:
+            target = min(self.targets, key=lambda f_t: abs(np.log2(freq / f_t)))
+            if abs(1200.0 * np.log2(freq / target)) <= self.fine_cents:
+                fine = self.fine_estimator(target)
+                fine_freq = fine.estimate(window_samples)
+                self.fine_passes += 1
+                if fine_freq > 0:
+                    freq, confidence = float(fine_freq), float(fine.confidence)
+        return PitchResult(freq, confidence, power, time.perf_counter() - start)
+
+    def detect_batch(self, samples, first_hop_end, n_hops):
+        return self.detect_sequential(samples, first_hop_end, n_hops)
+
+    def reset(self):
+        super().reset()
+        self.set_targets(self.targets)
+
+
+@register_detector("goertzel")
+class GoertzelDetector(PitchDetector):
+    """Banco de Goertzel alrededor de una cuerda conocida (modo manual).
+
+    Sin preclasificador: el banco cuesta menos que él y ya da su confianza.
+    El banco sólo cubre ``span_cents`` alrededor de la cuerda; si no encuentra
+    el tono o lo encuentra con confianza menor que ``fallback_confidence`` (lo
+    normal antes de afinar, con la cuerda a más de un semitono) corre también
+    un FFT+HPS sobre la misma ventana y gana la lectura más confiable, para
+    que la aguja siga indicando hacia dónde girar la clavija.
+    ``fallback_passes`` cuenta cuántas veces corrió.
+    """
+
+    default_window = GOERTZEL_WINDOW_SIZE
+    narrowband = True
+    pre_classify = False
+
+    def __init__(self, target_freq, n_harmonics=GOERTZEL_HARMONICS,
+                 fallback_confidence=GOERTZEL_FALLBACK_CONFIDENCE, **options):
+        self.target_freq = target_freq
+        self.n_harmonics = n_harmonics
+        self.fallback_confidence = fallback_confidence
+        super().__init__(**options)
+
+    def build_estimator(self, min_freq, max_freq, workers):
+        num_hps = NUM_HPS
+        if self.decimator:
+            num_hps = max(1, min(num_hps, int(self.decimator.passband // max_freq)))
+        self.fallback = make_hps_estimator(self.analysis_size, self.analysis_rate, min_freq, max_freq,
+                                           num_hps=num_hps, workers=workers)
+        self.fallback_passes = 0
+        return GoertzelPitchEstimator(self.analysis_size, self.analysis_rate, self.target_freq,
+                                      n_harmonics=self.n_harmonics)
+
+    def detect(self):
+        result = super().detect()
+        if result.confidence >= self.fallback_confidence or result.power < self.power_thresh:
+            return result
+        start = time.perf_counter()
+        freq = float(self.fallback.estimate(self.window_buffer.view()))
+        self.fallback_passes += 1
+        elapsed = result.elapsed + time.perf_counter() - start
+        if self.fallback.confidence <= result.confidence:
+            return result._replace(elapsed=elapsed)
+        return PitchResult(freq, float(self.fallback.confidence), result.power, elapsed)
+
+    def detect_batch(self, samples, first_hop_end, n_hops):
+        return self.detect_sequential(samples, first_hop_end, n_hops)
+
+
+class AnalysisWorker:
+    """Consume en un hilo propio los bloques que entrega el callback de PortAudio.
+
+    El callback sólo copia el bloque a una cola acotada (``push``); este hilo
+    alimenta la ventana con ``feed(block)`` y llama a ``analyze()`` cada
+    ``hop_size`` muestras. ``captured_at`` es el ``time.monotonic()`` con el
+    que llegó el último bloque entregado a ``feed``/``analyze_batch``.
+
+    Política de atraso:
+      - "drop-oldest": si la cola se llena se descartan los bloques más viejos,
+        y si hay varios saltos pendientes sólo se analiza la ventana más nueva.
+      - "catch-up": se analizan todos los saltos pendientes en orden. Si hay
+        más de uno y se dio ``analyze_batch(samples, first_hop_end, n_hops)``,
+        se le pasan todas las muestras nuevas de una vez; ``analyze_batch``
+        las analiza y también se encarga de agregarlas a la ventana. Su cola
+        por defecto es más larga (``CATCH_UP_MAX_PENDING_BLOCKS``); si aun así
+        se llena, se comporta como "drop-oldest" y ``stop()`` lo informa.
+    """
+
+    def __init__(self, feed, analyze, hop_size, policy="drop-oldest", max_pending=None,
+                 log=None, analyze_batch=None):
+        if policy not in BACKLOG_POLICIES:
+            raise ValueError(f"Política de atraso desconocida: {policy}")
+        if max_pending is None:
+            max_pending = CATCH_UP_MAX_PENDING_BLOCKS if policy == "catch-up" else MAX_PENDING_BLOCKS
+        self.feed = feed
+        self.analyze = analyze
+        self.analyze_batch = analyze_batch
+        self.hop_size = hop_size
+        self.policy = policy
+        self.max_pending = max_pending
+        self.log = log
+
+        # deque con maxlen: append/popleft son atómicos y al llenarse descarta el más viejo
+        self._queue = deque(maxlen=max_pending)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pending_samples = 0
+        self.captured_at = 0.0
+
+        self.dropped_blocks = 0
+        self.skipped_hops = 0
+        self.analyzed_hops = 0
+        self.batched_hops = 0
+
+    def push(self, block):
+        """Encola una copia del bloque (llamado desde el callback de audio)"""
+        if len(self._queue) == self.max_pending:
+            self.dropped_blocks += 1
+        self._queue.append((block.copy(), time.monotonic()))
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analisis-afinador", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self._queue.clear()
+        self._pending_samples = 0
+
+    def reset_counters(self):
+        self.dropped_blocks = 0
+        self.skipped_hops = 0
+        self.analyzed_hops = 0
+        self.batched_hops = 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(timeout=0.1)
+            self._wakeup.clear()
+
+            blocks = []
+            while True:
+                try:
+                    blocks.append(self._queue.popleft())
+                except IndexError:
+                    break
+            if not blocks:
+                continue
+
+            try:
+                if self.policy == "catch-up":
+                    self._catch_up(blocks)
+                else:
+                    self._latest_only(blocks)
+            except Exception as e:
+                if self.log:
+                    self.log(f"❌ Error en el análisis: {e}")
+
+    def _catch_up(self, blocks):
+        if self.analyze_batch is not None and len(blocks) > 1:
+            samples = np.concatenate([block for block, _ in blocks])
+            self.captured_at = blocks[-1][1]
+            total = self._pending_samples + len(samples)
+            hops = total // self.hop_size
+            if hops > 1:
+                self.analyze_batch(samples, self.hop_size - self._pending_samples, hops)
+                self._pending_samples = total - hops * self.hop_size
+                self.analyzed_hops += hops
+                self.batched_hops += hops
+                return
+
+        for block, captured_at in blocks:
+            self.captured_at = captured_at
+            while len(block):
+                take = min(len(block), self.hop_size - self._pending_samples)
+                self.feed(block[:take])
+                block = block[take:]
+                self._pending_samples += take
+                if self._pending_samples == self.hop_size:
+                    self._pending_samples = 0
+                    self.analyze()
+                    self.analyzed_hops += 1
+
+    def _latest_only(self, blocks):
+        for block, captured_at in blocks:
+            self.captured_at = captured_at
+            self.feed(block)
+            self._pending_samples += len(block)
+
+        hops = self._pending_samples // self.hop_size
+        if hops == 0:
+            return
+        self._pending_samples -= hops * self.hop_size
+        self.skipped_hops += hops - 1
+        self.analyze()
+        self.analyzed_hops += 1
+
+
+class Tuner:
+    """Afinador sin interfaz: audio -> AnalysisWorker -> detector -> suavizado y estabilidad.
+
+    ``profile`` es un InstrumentProfile (ver PROFILES): de él salen las
+    cuerdas, el rango de frecuencias aceptadas y la banda de búsqueda y el
+    corte de graves de los detectores. Tras cada cuadro analizado publica
+    ``snapshot``, un TunerSnapshot inmutable con ``current_string``,
+    ``detected_freq``, ``target_freq``, ``cents``, ``status``, ``is_stable``,
+    ``signal_level`` y ``confidence`` (la del PitchTracker mientras hay tono,
+    la del detector si no): las interfaces leen ese único objeto
+    (se reemplaza de una asignación) y no los atributos sueltos que el hilo
+    de análisis va reescribiendo. Un cuadro que no cambia ningún campo no se
+    publica: ``seq`` sólo avanza con un estado nuevo, y cada publicación llama
+    a ``update_callback`` (desde el hilo que la hizo) para que la interfaz se
+    redibuje sólo entonces.
+
+    Tras ``IDLE_AFTER_SECONDS`` de SEÑAL BAJA pasa a reposo (``idle``): la
+    ventana se sigue llenando pero no se estima el tono ni se publica nada,
+    sólo corre un detector de ataques sobre cada bloque. Un ataque vuelve al
+    análisis completo en el mismo bloque.
+
+    Las lecturas pasan por un PitchTracker (``tracker``); la cuerda es
+    estable cuando el filtro está ``locked``. Con ``onset_reset`` cada ataque
+    (una cuerda nueva) reinicia el filtro, que vuelve a confirmar la cuerda
+    en ``LOCK_READINGS`` lecturas sin arrastrar la nota anterior.
+    ``lock_times`` guarda el tiempo de audio en ms desde cada ataque hasta la
+    primera lectura estable.
+    """
+
+    def __init__(self, profile, log_callback=None, engine=PITCH_ENGINE, window_size=None,
+                 in_tune_cents=IN_TUNE_CENTS, policy=BACKLOG_POLICY, debug=False,
+                 update_callback=None, onset_reset=ONSET_RESET):
+        self.log_callback = log_callback
+        self.update_callback = update_callback
+        self.onset_reset = onset_reset
+        self.tracker = PitchTracker(median_size=MEDIAN_SIZE, noise_cents=READING_NOISE_CENTS,
+                                    drift_cents=DRIFT_CENTS, outlier_cents=OUTLIER_CENTS,
+                                    max_outliers=MAX_OUTLIERS, lock_cents=LOCK_CENTS,
+                                    lock_readings=LOCK_READINGS)
+        self.onset = EnergyOnsetDetector(ratio=ONSET_RATIO, min_power=MIN_SIGNAL_FOR_UPDATE)
+        self.in_tune_cents = in_tune_cents
+        self.debug = debug
+        self.debug_counter = 0  # Para imprimir cada N frames
+        self.selected_string = None
+        self.apply_profile(profile)
+        self.configure_analysis(window_size, engine)
+        self.worker = AnalysisWorker(
+            self.feed,
+            self.analyze_window,
+            hop_size=self.detector.hop_size,
+            policy=policy,
+            log=self.log,
+            analyze_batch=self.analyze_batch,
+        )
+        self.is_running = False
+        self.stream = None
+        self.seq = 0
+        self.reset()
+    
+    def apply_profile(self, profile):
+        self.profile = profile
+        self.targets = profile.targets
+        self.freq_range = profile.freq_range
+        self.cutoff_freq = profile.cutoff_freq
+    
+    def configure_analysis(self, window_size, engine, **options):
+        """Crea el detector del motor elegido para ventanas de window_size muestras"""
+        detector_cls = DETECTORS.get(engine)
+        if detector_cls is not None and detector_cls.needs_targets:
+            options["targets"] = list(self.targets.values())
+        if detector_cls is not None and issubclass(detector_cls, HPSDetector):
+            options.setdefault("num_hps", self.profile.num_hps)
+        self.detector = make_detector(
+            engine,
+            window_size=window_size,
+            min_freq=self.cutoff_freq,
+            max_freq=self.freq_range[1],
+            power_thresh=MIN_SIGNAL_FOR_UPDATE,
+            **options,
+        )
+        self.engine = engine
+        self.window_size = self.detector.window_size
+        if not self.detector.narrowband:
+            self.auto_engine = engine
+            self.auto_window_size = window_size
+    
+    def set_engine(self, engine, window_size=None, **options):
+        """Cambia de detector (y de ventana) en caliente"""
+        self.worker.stop()
+        self.configure_analysis(window_size, engine, **options)
+        self.worker.hop_size = self.detector.hop_size
+        self.reset()
+        if self.is_running:
+            self.worker.start()
+        self.log(f"🪟 Detector {engine}: ventana de {self.window_size} muestras "
+                 f"({1000 * self.window_size / SAMPLE_FREQ:.0f} ms)")
+    
+    def set_window_size(self, window_size):
+        """Cambia el tamaño de ventana en caliente (más corta = menos latencia)"""
+        if self.detector.narrowband:
+            self.auto_window_size = window_size  # Se aplica al volver al modo automático
+            return
+        self.set_engine(self.engine, window_size)
+    
+    def set_profile(self, profile):
+        """Cambia de instrumento: cuerdas y banda de búsqueda nuevas, modo automático"""
+        self.apply_profile(profile)
+        self.selected_string = None
+        self.set_engine(self.auto_engine, self.auto_window_size)
+    
+    def set_manual_string(self, string_name):
+        """Modo manual: con una cuerda elegida sólo se siguen los bins de su
+        fundamental y armónicos (detector "goertzel"); con None se vuelve a la
+        detección automática"""
+        self.selected_string = string_name
+        if string_name is None:
+            if self.detector.narrowband:
+                self.set_engine(self.auto_engine, self.auto_window_size)
+            return
+        self.set_engine("goertzel", target_freq=self.targets[string_name])
+    
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        
+    def cents_error(self, f_detected, f_target):
+        if f_target <= 0:
+            return 0.0
+        return 1200.0 * np.log2(f_detected / f_target)
+    
+    def find_closest_string(self, f_detected):
+        if self.selected_string is not None:
+            f_t = self.targets[self.selected_string]
+            return self.selected_string, f_t, self.cents_error(f_detected, f_t)
+        best = None
+        for s, f_t in self.targets.items():
+            c = self.cents_error(f_detected, f_t)
+            score = abs(c)
+            if best is None or score < best[0]:
+                best = (score, s, f_t, c)
+        _, s, f_t, c = best
+        return s, f_t, c
+    
+    def format_status(self, cents):
+        if abs(cents) <= self.in_tune_cents:
+            return "AFINADO"
+        return "AGUDO" if cents > 0 else "GRAVE"
+    
+    def audio_callback(self, indata, frames, time_info, status):
+        if status:
+            self.log(f"⚠️ Audio status: {status}")
+        
+        x = indata[:, 0]
+        if not np.any(x):
+            return
+        
+        self.worker.push(x)
+    
+    def enter_idle(self):
+        self.idle = True
+        self.onset.reset()
+        self.log("💤 Reposo: sólo se buscan ataques")
+    
+    def wake(self):
+        self.idle = False
+        self.low_signal_since = None
+        self.log("⚡ Ataque detectado: análisis completo")
+    
+    def feed(self, block):
+        # En reposo la ventana se sigue llenando (es barato): el ataque se analiza con ella completa
+        self.detector.feed(block)
+        if self.watch_onset(block) and self.idle:
+            self.wake()
+            self.analyze_window()  # Sin esperar al próximo salto
+    
+    def watch_onset(self, samples):
+        """Cuenta el audio desde el último ataque; True si ``samples`` trae uno nuevo"""
+        if self.samples_since_onset is not None:
+            self.samples_since_onset += len(samples)
+        if not self.onset.process(samples):
+            return False
+        if self.onset_reset:
+            self.start_note()
+        return True
+    
+    def start_note(self):
+        """Ataque: el seguimiento empieza de cero con la nota nueva"""
+        self.tracker.reset()
+        self.samples_since_onset = 0
+    
+    def analyze_window(self):
+        if self.idle:
+            return
+        self.process(self.detector.detect())
+    
+    def analyze_batch(self, samples, first_hop_end, n_hops):
+        if self.idle:
+            self.feed(samples)
+            return
+        self.watch_onset(samples)
+        for result in self.detector.detect_batch(samples, first_hop_end, n_hops):
+            self.process(result)
+    
+    def process(self, result):
+        self.last_result = result
+        if self.check_signal(result.power):
+            self.confidence = result.confidence
+            if result.frequency > 0:
+                self.update_pitch(result.frequency)
+            else:
+                self.mark_unpitched()
+        self.publish()
+    
+    def publish(self):
+        """Reemplaza ``snapshot`` por el estado actual (una sola asignación, atómica);
+        si ningún campo cambió no publica nada"""
+        fields = (self.current_string, self.detected_freq, self.target_freq, self.cents, self.status,
+                  self.is_stable, self.signal_level, self.confidence)
+        if self.seq and fields == self.snapshot[2:]:
+            return
+        self.seq += 1
+        self.snapshot = TunerSnapshot(self.seq, self.worker.captured_at, *fields)
+        if self.update_callback:
+            self.update_callback()
+    
+    def mark_unpitched(self):
+        """Hay señal pero no un tono (ruido o el detector no encontró período)"""
+        if self.status != "SIN TONO":
+            self.log(f"〰️ Sin tono definido (confianza {self.confidence:.0%})")
+        self.status = "SIN TONO"
+        self.current_string = "---"
+        self.is_stable = False
+        self.tracker.reset()
+    
+    def check_signal(self, signal_power):
+        """Actualiza el nivel de señal; devuelve False si no hay que estimar el tono.
+
+        ``signal_power`` es la potencia media de la ventana que lleva el
+        acumulador de energía del detector (RingBuffer.mean_power).
+        """
+        self.signal_level = signal_power
+        
+        # Detectar caída brusca de señal (nota decayendo)
+        if self.last_signal_level > 0:
+            signal_ratio = signal_power / self.last_signal_level
+            if signal_ratio < SIGNAL_DECAY_THRESHOLD and self.last_valid_freq:
+                # La señal está decayendo rápidamente, mantener última frecuencia válida
+                if self.debug and self.debug_counter % 10 == 0:
+                    print(f"\r[HOLD] Manteniendo última nota válida - Señal decayendo ({signal_ratio:.2%})", end="", flush=True)
+                self.last_signal_level = signal_power
+                return False  # No actualizar nada, mantener estado actual
+        
+        self.last_signal_level = signal_power
+        
+        if signal_power < POWER_THRESH:
+            if self.status != "SEÑAL BAJA":
+                self.log("🔇 Señal de audio muy baja")
+            self.status = "SEÑAL BAJA"
+            self.current_string = "---"
+            self.is_stable = False
+            self.tracker.reset()
+            now = time.monotonic()
+            if self.low_signal_since is None:
+                self.low_signal_since = now
+            elif now - self.low_signal_since >= IDLE_AFTER_SECONDS:
+                self.enter_idle()
+            return False
+        
+        self.low_signal_since = None
+        
+        # Verificar señal mínima para actualizar
+        if signal_power < MIN_SIGNAL_FOR_UPDATE:
+            return False  # Mantener estado actual
+        
+        return True
+    
+    def update_pitch(self, max_freq):
+        low, high = self.freq_range
+        # Debug: Imprimir frecuencia detectada cada 10 frames
+        if self.debug and self.debug_counter % 10 == 0:
+            print(f"\r[DEBUG] Freq: {max_freq:7.2f} Hz | Señal: {self.signal_level:8.2e} | Rango: {low:.0f}-{high:.0f} Hz", end="", flush=True)
+        self.debug_counter += 1
+        
+        if not (low <= max_freq <= high):
+            if self.status != "FUERA DE RANGO":
+                self.log(f"⚠️ Frecuencia fuera de rango: {max_freq:.2f} Hz")
+            self.status = "FUERA DE RANGO"
+            self.current_string = "---"
+            self.is_stable = False
+            self.tracker.reset()
+            return
+        
+        # Mediana + Kalman; una lectura aislada (salto de octava) no mueve la aguja
+        accepted = self.tracker.update(max_freq)
+        self.confidence = self.tracker.confidence  # La de la lectura filtrada, no la del cuadro
+        if not accepted:
+            return
+        
+        f = self.tracker.frequency
+        self.last_valid_freq = f  # Guardar última frecuencia válida
+        string_name, f_target, cents = self.find_closest_string(f)
+        status_txt = self.format_status(cents)
+        
+        stable = self.tracker.locked
+        
+        if stable and self.samples_since_onset is not None:
+            lock_ms = 1000 * self.samples_since_onset / SAMPLE_FREQ
+            self.lock_times.append(lock_ms)
+            self.samples_since_onset = None
+            if self.debug:
+                print(f"\n[LOCK] Lectura estable {lock_ms:.0f} ms después del ataque")
+        
+        # Debug: Imprimir información detallada de la nota detectada
+        if self.debug and self.debug_counter % 10 == 0:
+            stable_indicator = "✔" if stable else "⌛"
+            print(f" | Nota: {string_name:3} ({f_target:6.2f}Hz) | Desv: {cents:+6.2f}c | Estado: {status_txt:7} | {stable_indicator}", end="", flush=True)
+        
+        # Anunciar al confirmarse la cuerda (current_string se actualiza cada frame)
+        if stable and (string_name != self.current_string or not self.is_stable):
+            if self.debug:
+                print()  # Nueva línea para separar del debug
+            self.log(f"🎵 Cuerda detectada: {string_name} ({f:.2f} Hz)")
+        
+        if stable and status_txt == "AFINADO" and (self.status != "AFINADO" or not self.is_stable):
+            if self.debug:
+                print()  # Nueva línea para separar del debug
+            self.log(f"✅ ¡{string_name} está afinado! ({cents:+.1f} cents)")
+        
+        self.current_string = string_name
+        self.detected_freq = f
+        self.target_freq = f_target
+        self.cents = cents
+        self.status = status_txt
+        self.is_stable = stable
+    
+    def start(self):
+        if not self.is_running:
+            try:
+                self.log("🎤 Iniciando captura de audio...")
+                if not AUDIO_AVAILABLE:
+                    raise RuntimeError("sounddevice no está disponible")
+                self.is_running = True
+                self.worker.reset_counters()
+                self.worker.start()
+                self.stream = sd.InputStream(
+                    channels=1,
+                    callback=self.audio_callback,
+                    blocksize=min(BLOCK_SIZE, self.detector.hop_size),
+                    samplerate=SAMPLE_FREQ,
+                    dtype="float32",
+                )
+                self.stream.start()
+                self.log(f"✅ Audio iniciado (Sample Rate: {SAMPLE_FREQ} Hz)")
+                return True
+            except Exception as e:
+                self.is_running = False
+                self.worker.stop()
+                self.log(f"❌ Error al iniciar audio: {e}")
+                return False
+        return True
+    
+    def stop(self):
+        if self.is_running:
+            self.log("⏹️ Deteniendo afinador...")
+            self.is_running = False
+            if self.stream:
+                self.stream.stop()
+                self.stream.close()
+            self.worker.stop()
+            if self.worker.dropped_blocks or self.worker.skipped_hops:
+                self.log(f"📉 Bloques descartados: {self.worker.dropped_blocks} | "
+                         f"Saltos sin analizar: {self.worker.skipped_hops}")
+            if self.worker.dropped_blocks and self.worker.policy == "catch-up":
+                self.log(f"⚠️ La cola de catch-up ({self.worker.max_pending} bloques) se llenó: "
+                         "se descartaron los bloques más viejos como en drop-oldest")
+            if self.lock_times:
+                self.log(f"⏱️ Ataque a lectura estable: mediana {np.median(self.lock_times):.0f} ms "
+                         f"({len(self.lock_times)} notas)")
+            if self.detector.unpitched_frames:
+                self.log(f"🧹 Cuadros sin tono salteados: {self.detector.unpitched_frames} "
+                         f"de {self.detector.classified_frames}")
+            self.reset()
+            self.log("✅ Afinador detenido")
+    
+    def reset(self):
+        self.detector.reset()
+        self.tracker.reset()
+        self.current_string = "---"
+        self.detected_freq = 0.0
+        self.target_freq = 0.0
+        self.cents = 0.0
+        self.status = "ESPERANDO"
+        self.is_stable = False
+        self.signal_level = 0.0
+        self.confidence = 0.0
+        self.last_result = None
+        self.last_valid_freq = None  # Última frecuencia válida
+        self.last_signal_level = 0.0  # Nivel anterior de señal
+        self.idle = False
+        self.low_signal_since = None
+        self.onset.reset()
+        self.samples_since_onset = None  # Muestras desde el último ataque, hasta estabilizar
+        self.lock_times = []  # ms de audio desde cada ataque hasta la lectura estable
+        self.publish()
@@ -1,15 +1,13 @@
 
-import copy
-import threading
-import numpy as np
-import scipy.fftpack
-import sounddevice as sd
 import customtkinter as ctk
 from tkinter import Canvas
 from PIL import Image
-from datetime import datetime
 import os
 import math
+
+from afinador_motor import PITCH_ENGINE, PROFILES, Tuner, make_arg_parser
+from afinador_ui import DisplayRefresher, LogBus
+
 try:
     import pygame
     pygame.mixer.init()
@@ -20,291 +18,30 @@ except:
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
 
-SAMPLE_FREQ = 48000
-WINDOW_SIZE = 32768
-WINDOW_STEP = 8192
-NUM_HPS = 5
-POWER_THRESH = 1e-6
-WHITE_NOISE_THRESH = 0.20
-CONCERT_PITCH = 440.0
-
-# Parámetros de estabilidad mejorados
-SMOOTH_ALPHA = 0.35  # Aumentado para más suavizado
-STABLE_FRAMES = 5  # Más frames para confirmar estabilidad
-SIGNAL_DECAY_THRESHOLD = 0.3  # Si señal cae >30%, congelar aguja
-MIN_SIGNAL_FOR_UPDATE = 2e-6  # Señal mínima para actualizar
-FREQ_BUFFER_SIZE = 5  # Tamaño del buffer de promedio móvil
-
 LOW_G = False
 
-UKULELE_TARGETS = {
-    ("G4" if not LOW_G else "G3"): (392.00 if not LOW_G else 196.00),
-    "C4": 262.63,
-    "E4": 329.63,
-    "A4": 440.00,
-}
-
-GUITAR_TARGETS = {
-    "E2": 82.00,
-    "A2": 110.00,
-    "D3": 146.80,
-    "G3": 196.00,
-    "B3": 246.94,
-    "E4": 330.00,
-}
+UKULELE_PROFILE = PROFILES["ukulele-low-g" if LOW_G else "ukulele"]
 
 CURRENT_INSTRUMENT = "ukulele"
 
+def get_current_profile():
+    return UKULELE_PROFILE if CURRENT_INSTRUMENT == "ukulele" else PROFILES["guitar"]
+
 def get_current_targets():
-    return UKULELE_TARGETS if CURRENT_INSTRUMENT == "ukulele" else GUITAR_TARGETS
+    return get_current_profile().targets
 
-DELTA_FREQ = SAMPLE_FREQ / WINDOW_SIZE
-OCTAVE_BANDS = [50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600]
-HANN_WINDOW = np.hanning(WINDOW_SIZE)
 
+class SemiCircleGauge(ctk.CTkCanvas):
+    """Widget de gauge semicircular para mostrar afinación en cents.
 
-class UkuleleTuner:
-    def __init__(self, log_callback=None, debug=True):
-        self.window_samples = np.zeros(WINDOW_SIZE, dtype=np.float32)
-        self.stable_buffer = []
-        self.smooth_freq = None
-        self.is_running = False
-        self.stream = None
-        self.log_callback = log_callback
-        self.debug = debug
-        self.debug_counter = 0  # Para imprimir cada N frames
-        
-        self.current_string = "---"
-        self.detected_freq = 0.0
-        self.target_freq = 0.0
-        self.cents = 0.0
-        self.status = "ESPERANDO"
-        self.is_stable = False
-        self.signal_level = 0.0
-        
-        # Variables para estabilidad mejorada
-        self.last_valid_freq = None  # Última frecuencia válida
-        self.last_signal_level = 0.0  # Nivel anterior de señal
-        self.freq_buffer = []  # Buffer de frecuencias para promedio móvil
-        
-    def log(self, message):
-        if self.log_callback:
-            self.log_callback(message)
-        
-    def cents_error(self, f_detected, f_target):
-        if f_target <= 0:
-            return 0.0
-        return 1200.0 * np.log2(f_detected / f_target)
-    
-    def find_closest_string(self, f_detected):
-        best = None
-        targets = get_current_targets()
-        for s, f_t in targets.items():
-            c = self.cents_error(f_detected, f_t)
-            score = abs(c)
-            if best is None or score < best[0]:
-                best = (score, s, f_t, c)
-        _, s, f_t, c = best
-        return s, f_t, c
+    El dial se dibuja una sola vez (y de nuevo sólo si cambia el tamaño); la
+    aguja, su resplandor y el centro son ítems fijos que ``animate`` mueve con
+    ``coords()`` y recolorea con ``itemconfigure()`` sólo cuando cambian.
+    ``update_needle`` programa la animación cada ``ANIMATION_MS`` y ésta se
+    detiene sola cuando la aguja llega al objetivo.
+    """
+    ANIMATION_MS = 50
     
-    def format_status(self, cents):
-        if abs(cents) <= 10:
-            return "AFINADO"
-        return "AGUDO" if cents > 0 else "GRAVE"
-    
-    def audio_callback(self, indata, frames, time_info, status):
-        if status:
-            self.log(f"⚠️ Audio status: {status}")
-        
-        x = indata[:, 0]
-        if not np.any(x):
-            return
-        
-        self.window_samples = np.concatenate((self.window_samples, x)).astype(np.float32)
-        self.window_samples = self.window_samples[len(x):]
-        
-        signal_power = (np.linalg.norm(self.window_samples, ord=2) ** 2) / len(self.window_samples)
-        self.signal_level = signal_power
-        
-        # Detectar caída brusca de señal (nota decayendo)
-        if self.last_signal_level > 0:
-            signal_ratio = signal_power / self.last_signal_level
-            if signal_ratio < SIGNAL_DECAY_THRESHOLD and self.last_valid_freq:
-                # La señal está decayendo rápidamente, mantener última frecuencia válida
-                if self.debug and self.debug_counter % 10 == 0:
-                    print(f"\r[HOLD] Manteniendo última nota válida - Señal decayendo ({signal_ratio:.2%})", end="", flush=True)
-                self.last_signal_level = signal_power
-                return  # No actualizar nada, mantener estado actual
-        
-        self.last_signal_level = signal_power
-        
-        if signal_power < POWER_THRESH:
-            if self.status != "SEÑAL BAJA":
-                self.log("Señal de audio muy baja")
-            self.status = "SEÑAL BAJA"
-            self.current_string = "---"
-            self.is_stable = False
-            self.freq_buffer.clear()
-            return
-        
-        # Verificar señal mínima para actualizar
-        if signal_power < MIN_SIGNAL_FOR_UPDATE:
-            return  # Mantener estado actual
-        
-        hann_samples = self.window_samples * HANN_WINDOW
-        magnitude_spec = np.abs(scipy.fftpack.fft(hann_samples)[:WINDOW_SIZE // 2])
-        
-        # Filtro de corte bajo para eliminar ruido, pero permitir E2 de guitarra (82 Hz)
-        cutoff_bins = int(50 / DELTA_FREQ)
-        magnitude_spec[:cutoff_bins] = 0.0
-        
-        for j in range(len(OCTAVE_BANDS) - 1):
-            ind_start = int(OCTAVE_BANDS[j] / DELTA_FREQ)
-            ind_end = int(OCTAVE_BANDS[j + 1] / DELTA_FREQ)
-            ind_end = min(ind_end, len(magnitude_spec))
-            if ind_end <= ind_start + 1:
-                continue
-            
-            band = magnitude_spec[ind_start:ind_end]
-            avg_energy = (np.linalg.norm(band, ord=2) ** 2) / (ind_end - ind_start)
-            avg_energy = np.sqrt(avg_energy)
-            
-            thresh = WHITE_NOISE_THRESH * avg_energy
-            band[band < thresh] = 0.0
-            magnitude_spec[ind_start:ind_end] = band
-        
-        ipol_x = np.arange(0, len(magnitude_spec))
-        ipol_x2 = np.arange(0, len(magnitude_spec), 1 / NUM_HPS)
-        mag_spec_ipol = np.interp(ipol_x2, ipol_x, magnitude_spec)
-        
-        norm = np.linalg.norm(mag_spec_ipol, ord=2)
-        if norm > 0:
-            mag_spec_ipol = mag_spec_ipol / norm
-        
-        hps_spec = copy.deepcopy(mag_spec_ipol)
-        
-        for factor in range(2, NUM_HPS + 1):
-            decimated = mag_spec_ipol[::factor]
-            limit = min(len(hps_spec), len(decimated))
-            tmp = hps_spec[:limit] * decimated[:limit]
-            if not np.any(tmp):
-                break
-            hps_spec = tmp
-        
-        max_ind = int(np.argmax(hps_spec))
-        max_freq = max_ind * (SAMPLE_FREQ / WINDOW_SIZE) / NUM_HPS
-        
-        # Debug: Imprimir frecuencia detectada cada 10 frames (~0.5 segundos)
-        if self.debug and self.debug_counter % 10 == 0:
-            print(f"\r[DEBUG] Freq: {max_freq:7.2f} Hz | Señal: {signal_power:8.2e} | Rango: 75-650 Hz", end="", flush=True)
-        self.debug_counter += 1
-        
-        # Rango ampliado para guitarra: E2 (82 Hz) hasta más allá de E4 (329 Hz)
-        if not (75.0 <= max_freq <= 650.0):
-            if self.status != "FUERA DE RANGO":
-                self.log(f"\n Frecuencia fuera de rango: {max_freq:.2f} Hz")
-            self.status = "FUERA DE RANGO"
-            self.current_string = "---"
-            self.is_stable = False
-            self.freq_buffer.clear()
-            return
-        
-        # Agregar frecuencia al buffer para promedio móvil
-        self.freq_buffer.append(max_freq)
-        if len(self.freq_buffer) > FREQ_BUFFER_SIZE:
-            self.freq_buffer.pop(0)
-        
-        # Usar promedio del buffer en lugar de solo la última lectura
-        avg_freq = sum(self.freq_buffer) / len(self.freq_buffer)
-        
-        if self.smooth_freq is None:
-            self.smooth_freq = avg_freq
-        else:
-            self.smooth_freq = (1 - SMOOTH_ALPHA) * avg_freq + SMOOTH_ALPHA * self.smooth_freq
-        
-        f = float(self.smooth_freq)
-        self.last_valid_freq = f  # Guardar última frecuencia válida
-        string_name, f_target, cents = self.find_closest_string(f)
-        status_txt = self.format_status(cents)
-        
-        # Calcular estabilidad primero
-        self.stable_buffer.insert(0, string_name)
-        self.stable_buffer = self.stable_buffer[:STABLE_FRAMES]
-        stable = (len(self.stable_buffer) == STABLE_FRAMES and 
-                 self.stable_buffer.count(self.stable_buffer[0]) == STABLE_FRAMES)
-        
-        # Debug: Imprimir información detallada de la nota detectada
-        if self.debug and self.debug_counter % 10 == 0:
-            stable_indicator = "✔" if stable else "⌛"
-            status_color = "VERDE" if status_txt == "AFINADO" else ("NARANJA" if status_txt == "AGUDO" else "ROJO")
-            print(f" | Nota: {string_name:3} ({f_target:6.2f}Hz) | Desv: {cents:+6.2f}c | Estado: {status_txt:7} | {stable_indicator}", end="", flush=True)
-        
-        if stable and string_name != self.current_string:
-            if self.debug:
-                print()  # Nueva línea para separar del debug
-            self.log(f"🎵 Cuerda detectada: {string_name} ({f:.2f} Hz)")
-        
-        if stable and status_txt == "AFINADO" and self.status != "AFINADO":
-            if self.debug:
-                print()  # Nueva línea para separar del debug
-            self.log(f" ¡{string_name} está afinado! ({cents:+.1f} cents)")
-        
-        self.current_string = string_name
-        self.detected_freq = f
-        self.target_freq = f_target
-        self.cents = cents
-        self.status = status_txt
-        self.is_stable = stable
-    
-    def start(self):
-        if not self.is_running:
-            try:
-                self.log("🎤 Iniciando captura de audio...")
-                self.is_running = True
-                self.stream = sd.InputStream(
-                    channels=1,
-                    callback=self.audio_callback,
-                    blocksize=WINDOW_STEP,
-                    samplerate=SAMPLE_FREQ,
-                    dtype="float32",
-                )
-                self.stream.start()
-                self.log(f" Audio iniciado (Sample Rate: {SAMPLE_FREQ} Hz)")
-                return True
-            except Exception as e:
-                self.is_running = False
-                self.log(f" Error al iniciar audio: {e}")
-                return False
-        return True
-    
-    def stop(self):
-        if self.is_running:
-            self.log(" Deteniendo afinador...")
-            self.is_running = False
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-            self.reset()
-            self.log("✅ Afinador detenido")
-    
-    def reset(self):
-        self.window_samples = np.zeros(WINDOW_SIZE, dtype=np.float32)
-        self.stable_buffer = []
-        self.smooth_freq = None
-        self.current_string = "---"
-        self.detected_freq = 0.0
-        self.target_freq = 0.0
-        self.cents = 0.0
-        self.status = "ESPERANDO"
-        self.is_stable = False
-        self.signal_level = 0.0
-        self.last_valid_freq = None
-        self.last_signal_level = 0.0
-        self.freq_buffer = []
-
-
-class SemiCircleGauge(ctk.CTkCanvas):
-    """Widget de gauge semicircular para mostrar afinación en cents"""
     def __init__(self, parent, width=550, height=350, **kwargs):
         super().__init__(parent, width=width, height=height, 
                         bg="#f5f5f5", highlightthickness=0, **kwargs)
@@ -314,11 +51,19 @@ class SemiCircleGauge(ctk.CTkCanvas):
         self.target_angle = 0   # Ángulo objetivo de la aguja
         self.cents = 0
         self.is_tuned = False
+        self.animation_job = None
         
         self.draw_gauge()
+        self.bind("<Configure>", self.on_resize)
+    
+    def on_resize(self, event):
+        """Redibuja el dial sólo si el canvas cambió de tamaño"""
+        if (event.width, event.height) != (self.width, self.height):
+            self.width, self.height = event.width, event.height
+            self.draw_gauge()
     
     def draw_gauge(self):
-        """Dibuja el gauge base (sin aguja)"""
+        """Dibuja el gauge base y crea los ítems de la aguja"""
         self.delete("all")
         
         # Centro y radio
@@ -385,6 +130,15 @@ class SemiCircleGauge(ctk.CTkCanvas):
         # Círculo central decorativo
         self.create_oval(cx - 15, cy - 15, cx + 15, cy + 15, 
                         fill="#f5f5f5", outline="#ccc", width=2)
+        
+        # Aguja: efecto glow (más grande), aguja principal y círculo central encima
+        self.glow_item = self.create_line(cx, cy, cx, cy, width=10, capstyle="round")
+        self.needle_item = self.create_line(cx, cy, cx, cy, width=6, capstyle="round")
+        self.hub_item = self.create_oval(cx - 10, cy - 10, cx + 10, cy + 10,
+                                         outline="white", width=2)
+        self.drawn_angle = None
+        self.drawn_color = None
+        self.draw_needle()
     
     def update_needle(self, cents, is_tuned=False):
         """Actualiza la posición de la aguja con animación suave"""
@@ -393,25 +147,33 @@ class SemiCircleGauge(ctk.CTkCanvas):
         
         # Calcular ángulo objetivo
         self.target_angle = 180 - (self.cents + 80) * 180 / 160
+        self.start_animation()
+    
+    def start_animation(self):
+        if self.animation_job is None:
+            self.animation_job = self.after(self.ANIMATION_MS, self.step_animation)
+    
+    def step_animation(self):
+        """Un paso de la animación; se vuelve a programar sólo si la aguja sigue en movimiento"""
+        self.animation_job = None
+        if self.animate():
+            self.start_animation()
         
     def animate(self):
-        """Anima la aguja hacia el ángulo objetivo"""
-        # Interpolación suave
+        """Anima la aguja hacia el ángulo objetivo; devuelve False cuando ya
+        llegó (y entonces no toca el canvas)"""
+        # Interpolación suave; a menos de una décima de grado se fija en el objetivo
         diff = self.target_angle - self.current_angle
-        self.current_angle += diff * 0.15
+        if abs(diff) < 0.1:
+            self.current_angle = self.target_angle
+        else:
+            self.current_angle += diff * 0.15
         
-        # Redibujar gauge y aguja
-        self.draw_gauge()
         self.draw_needle()
+        return self.current_angle != self.target_angle
         
     def draw_needle(self):
-        """Dibuja la aguja en la posición actual"""
-        cx = self.width / 2
-        cy = self.height - 40
-        radius = min(self.width, self.height) - 60
-        
-        angle_rad = math.radians(self.current_angle)
-        
+        """Mueve y recolorea la aguja sólo si cambió desde el último dibujo"""
         # Determinar color basado en afinación
         if abs(self.cents) <= 10:
             color = "#00d9a5"  # Verde - afinado
@@ -423,21 +185,28 @@ class SemiCircleGauge(ctk.CTkCanvas):
             color = "#ff4757"  # Rojo - grave
             glow_color = "#ff6666"
         
+        if color != self.drawn_color:
+            self.drawn_color = color
+            self.itemconfigure(self.glow_item, fill=glow_color)
+            self.itemconfigure(self.needle_item, fill=color)
+            self.itemconfigure(self.hub_item, fill=color)
+        
+        if self.current_angle == self.drawn_angle:
+            return
+        self.drawn_angle = self.current_angle
+        
+        cx = self.width / 2
+        cy = self.height - 40
+        radius = min(self.width, self.height) - 60
+        
+        angle_rad = math.radians(self.current_angle)
+        
         # Punto final de la aguja
         needle_x = cx + (radius - 45) * math.cos(angle_rad)
         needle_y = cy - (radius - 45) * math.sin(angle_rad)
         
-        # Efecto glow (más grande)
-        self.create_line(cx, cy, needle_x, needle_y, 
-                        fill=glow_color, width=10, capstyle="round")
-        
-        # Aguja principal (más gruesa)
-        self.create_line(cx, cy, needle_x, needle_y, 
-                        fill=color, width=6, capstyle="round")
-        
-        # Círculo central sobre la aguja (más grande)
-        self.create_oval(cx - 10, cy - 10, cx + 10, cy + 10, 
-                        fill=color, outline="white", width=2)
+        self.coords(self.glow_item, cx, cy, needle_x, needle_y)
+        self.coords(self.needle_item, cx, cy, needle_x, needle_y)
 
 
 class CircularStringButton(ctk.CTkFrame):
@@ -523,18 +292,22 @@ class CircularStringButton(ctk.CTkFrame):
             self.command(self.string_name)
     
     def set_active(self, active):
-        """Establece el estado activo del botón"""
+        """Establece el estado activo del botón (sólo redibuja si cambió)"""
+        if active == self.is_active:
+            return
         self.is_active = active
         self.draw()
     
     def set_tuned(self, tuned):
-        """Establece el estado de afinado del botón"""
+        """Establece el estado de afinado del botón (sólo redibuja si cambió)"""
+        if tuned == self.is_tuned:
+            return
         self.is_tuned = tuned
         self.draw()
 
 
 class TunerGUI(ctk.CTk):
-    def __init__(self):
+    def __init__(self, window_size=None, engine=PITCH_ENGINE):
         super().__init__()
 
         # Configuración de ventana
@@ -543,7 +316,20 @@ class TunerGUI(ctk.CTk):
         self.resizable(False, False)
         self.configure(fg_color="#f5f5f5")
 
-        self.tuner = UkuleleTuner(log_callback=self.add_log)
+        self.refresher = DisplayRefresher(self, self.update_display)
+        self.log_bus = LogBus(self, maxlen=50)
+        self.log_messages = self.log_bus.lines  # Últimos 50 mensajes, tras log_bus.flush()
+        
+        # El rango de búsqueda y el corte de graves salen del perfil del instrumento
+        self.tuner = Tuner(
+            get_current_profile(),
+            log_callback=self.log_bus.post,
+            engine=engine,
+            window_size=window_size,
+            in_tune_cents=10.0,
+            debug=True,
+            update_callback=self.refresher.request,
+        )
         
         self.auto_mode = True
         self.selected_string = None
@@ -551,8 +337,9 @@ class TunerGUI(ctk.CTk):
         self.tuned_strings = set()  # Conjunto de cuerdas ya afinadas
         
         # Sistema de confirmación con delay
-        self.tuning_confirmation = {}  # {string_name: consecutive_frames}
-        self.CONFIRMATION_FRAMES = 30  # ~1.5 segundos a 20 FPS
+        self.tuning_confirmation = {}  # {string_name: captured_at del primer cuadro afinado}
+        self.CONFIRMATION_SECONDS = 1.5
+        self.shown_seq = None  # Último TunerSnapshot dibujado
         
         # Sistema de resplandor de fondo
         self.glow_frame = 0
@@ -665,14 +452,11 @@ class TunerGUI(ctk.CTk):
         self.create_string_buttons()
         
         # Log inicial
-        self.log_messages = []
         self.add_log("📱 Afinador iniciado. Escucha automática activada.")
         
         # Iniciar tuner automáticamente
+        self.refresher.start()
         self.tuner.start()
-        
-        # Iniciar actualización de display
-        self.update_display()
     
     def create_string_buttons(self):
         """Crea los botones de cuerdas según el instrumento actual"""
@@ -735,8 +519,9 @@ class TunerGUI(ctk.CTk):
         # Recrear botones de cuerdas
         self.create_string_buttons()
         
-        # Resetear tuner
-        self.tuner.reset()
+        # Resetear tuner con las cuerdas del nuevo instrumento
+        self.selected_string = None
+        self.tuner.set_profile(get_current_profile())
     
     def toggle_auto_mode(self):
         """Alterna entre modo automático y manual"""
@@ -744,6 +529,7 @@ class TunerGUI(ctk.CTk):
         if self.auto_mode:
             self.add_log("🔄 Modo automático activado")
             self.selected_string = None
+            self.tuner.set_manual_string(None)
             # Desactivar todos los botones
             for btn in self.string_buttons.values():
                 btn.set_active(False)
@@ -755,6 +541,8 @@ class TunerGUI(ctk.CTk):
         if not self.auto_mode:
             self.selected_string = string_name
             self.add_log(f"🎯 Cuerda seleccionada: {string_name}")
+            # Sólo se siguen la fundamental y armónicos de esta cuerda
+            self.tuner.set_manual_string(string_name)
             
             # Actualizar estado visual de botones
             for name, btn in self.string_buttons.items():
@@ -762,109 +550,106 @@ class TunerGUI(ctk.CTk):
 
     def add_log(self, message):
         """Agrega un mensaje al log (guardado en memoria)"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
-        self.log_messages.append(log_message)
-        # Mantener solo los últimos 50 mensajes
-        if len(self.log_messages) > 50:
-            self.log_messages.pop(0)
+        self.log_bus.post(message)
 
     def update_display(self):
-        """Actualiza la interfaz gráfica"""
+        """Actualiza la interfaz gráfica con el último cuadro del afinador"""
+        snap = self.tuner.snapshot
+        if snap.seq == self.shown_seq:
+            return
+        self.shown_seq = snap.seq
+        self.show_snapshot(snap)
+        
         if self.tuner.is_running:
-            # Actualizar gauge con animación
-            if self.tuner.is_stable and self.tuner.status not in ["ESPERANDO", "SEÑAL BAJA", "FUERA DE RANGO"]:
-                self.gauge.update_needle(self.tuner.cents, self.tuner.status == "AFINADO")
-            else:
-                self.gauge.update_needle(0, False)
-            
-            self.gauge.animate()
-            
-            # Actualizar indicador de estado (Bajo/Perfecto/Alto)
-            if self.tuner.is_stable and self.tuner.status not in ["ESPERANDO", "SEÑAL BAJA", "FUERA DE RANGO"]:
-                if self.tuner.status == "AFINADO":
-                    self.status_label.configure(text="Perfecto", text_color="#00d9a5")
-                    
-                    # Sistema de confirmación con delay
-                    if self.auto_mode and self.tuner.current_string not in self.tuned_strings:
-                        current_string = self.tuner.current_string
-                        
-                        # Incrementar contador de frames consecutivos
-                        if current_string not in self.tuning_confirmation:
-                            self.tuning_confirmation[current_string] = 0
-                        
-                        self.tuning_confirmation[current_string] += 1
-                        
-                        # Si alcanza el umbral, confirmar afinación
-                        if self.tuning_confirmation[current_string] >= self.CONFIRMATION_FRAMES:
-                            self.tuned_strings.add(current_string)
-                            self.add_log(f"✅ ¡{current_string} afinada correctamente!")
-                            
-                            # Reproducir sonido de éxito
-                            if self.success_sound:
-                                try:
-                                    self.success_sound.play()
-                                except Exception as e:
-                                    pass
-                            
-                            # Marcar el botón como afinado
-                            if current_string in self.string_buttons:
-                                self.string_buttons[current_string].set_tuned(True)
-                            
-                            # Iniciar resplandor de fondo
-                            self.start_glow()
-                            
-                            # Limpiar contador
-                            self.tuning_confirmation.pop(current_string, None)
-                else:
-                    # Si no está afinado, resetear contador
-                    if self.tuner.current_string in self.tuning_confirmation:
-                        self.tuning_confirmation.pop(self.tuner.current_string)
-                    
-                    if self.tuner.status == "AGUDO":
-                        self.status_label.configure(text="Alto", text_color="#ffa502")
-                    else:  # GRAVE
-                        self.status_label.configure(text="Bajo", text_color="#ff4757")
-            else:
-                self.status_label.configure(text="---", text_color="#ccc")
-                # Resetear todos los contadores si no hay señal estable
-                self.tuning_confirmation.clear()
-            
-            # Actualizar frecuencia
-            if self.tuner.detected_freq > 0:
-                self.freq_label.configure(text=f"{int(self.tuner.detected_freq)}Hz", text_color="#666")
-            else:
-                self.freq_label.configure(text="---Hz", text_color="#ccc")
-            
-            # Actualizar botones de cuerdas
-            if self.auto_mode:
-                for name, btn in self.string_buttons.items():
-                    # Si ya está afinada, mantener verde
-                    if name in self.tuned_strings:
-                        btn.set_tuned(True)
-                    else:
-                        # Resaltar la cuerda actual
-                        is_current = (name == self.tuner.current_string and self.tuner.is_stable)
-                        btn.set_active(is_current)
-                        btn.set_tuned(False)
+            self.confirm_tuning(snap)
+    
+    def show_snapshot(self, snap):
+        """Lleva un TunerSnapshot nuevo a los widgets"""
+        tuning = snap.is_stable and snap.status not in ["ESPERANDO", "SEÑAL BAJA", "FUERA DE RANGO"]
+        
+        # Actualizar gauge con animación
+        if tuning:
+            self.gauge.update_needle(snap.cents, snap.status == "AFINADO")
         else:
-            # Tuner detenido
             self.gauge.update_needle(0, False)
-            self.gauge.animate()
-            self.status_label.configure(text="---", text_color="#ccc")
-            self.freq_label.configure(text="---Hz")
         
-        # Actualizar resplandor de fondo si está activo
-        if self.is_glowing:
-            self.update_glow()
+        # Actualizar indicador de estado (Bajo/Perfecto/Alto)
+        show = self.refresher.configure
+        if not tuning:
+            show(self.status_label, text="---", text_color="#ccc")
+        elif snap.status == "AFINADO":
+            show(self.status_label, text="Perfecto", text_color="#00d9a5")
+        elif snap.status == "AGUDO":
+            show(self.status_label, text="Alto", text_color="#ffa502")
+        else:  # GRAVE
+            show(self.status_label, text="Bajo", text_color="#ff4757")
+        
+        # Actualizar frecuencia
+        if snap.detected_freq > 0:
+            show(self.freq_label, text=f"{int(snap.detected_freq)}Hz", text_color="#666")
+        else:
+            show(self.freq_label, text="---Hz", text_color="#ccc")
         
-        # Llamar nuevamente después de 50ms
-        self.after(50, self.update_display)
+        # Actualizar botones de cuerdas
+        if self.auto_mode:
+            for name, btn in self.string_buttons.items():
+                # Si ya está afinada, mantener verde
+                if name in self.tuned_strings:
+                    btn.set_tuned(True)
+                else:
+                    # Resaltar la cuerda actual
+                    is_current = (name == snap.current_string and snap.is_stable)
+                    btn.set_active(is_current)
+                    btn.set_tuned(False)
+    
+    def confirm_tuning(self, snap):
+        """Sistema de confirmación con delay: la cuerda tiene que seguir afinada
+        CONFIRMATION_SECONDS de audio seguidos"""
+        if not snap.is_stable or snap.status in ["ESPERANDO", "SEÑAL BAJA", "FUERA DE RANGO"]:
+            # Resetear todos los contadores si no hay señal estable
+            self.tuning_confirmation.clear()
+            return
+        
+        current_string = snap.current_string
+        if snap.status != "AFINADO":
+            # Si no está afinado, resetear contador
+            self.tuning_confirmation.pop(current_string, None)
+            return
+        
+        if not self.auto_mode or current_string in self.tuned_strings:
+            return
+        
+        # Momento del primer cuadro afinado de la racha
+        since = self.tuning_confirmation.setdefault(current_string, snap.captured_at)
+        
+        # Si alcanza el umbral, confirmar afinación
+        if snap.captured_at - since >= self.CONFIRMATION_SECONDS:
+            self.tuned_strings.add(current_string)
+            self.add_log(f"✅ ¡{current_string} afinada correctamente!")
+            
+            # Reproducir sonido de éxito
+            if self.success_sound:
+                try:
+                    self.success_sound.play()
+                except Exception as e:
+                    pass
+            
+            # Marcar el botón como afinado
+            if current_string in self.string_buttons:
+                self.string_buttons[current_string].set_tuned(True)
+            
+            # Iniciar resplandor de fondo
+            self.start_glow()
+            
+            # Limpiar contador
+            self.tuning_confirmation.pop(current_string, None)
     
     def start_glow(self):
         """Inicia el efecto de resplandor verde en el fondo"""
-        self.is_glowing = True
         self.glow_frame = 0
+        if not self.is_glowing:  # Si ya está en curso sólo vuelve a empezar
+            self.is_glowing = True
+            self.after(50, self.update_glow)
     
     def update_glow(self):
         """Actualiza el color del fondo con efecto de resplandor suave"""
@@ -889,6 +674,7 @@ class TunerGUI(ctk.CTk):
             
             color_bg = f"#{r:02x}{g:02x}{b:02x}"
             self.main_container.configure(fg_color=color_bg)
+            self.after(50, self.update_glow)
         else:
             # Terminar resplandor
             self.is_glowing = False
@@ -896,10 +682,13 @@ class TunerGUI(ctk.CTk):
 
 
 def main():
-    app = TunerGUI()
+    args = make_arg_parser().parse_args()
+    app = TunerGUI(window_size=args.window, engine=args.engine)
     
     def on_closing():
         app.tuner.stop()
+        app.refresher.cancel()
+        app.log_bus.cancel()
         app.destroy()
     
     app.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,201 @@
+"""
+Refresco de las interfaces Tk con cada cuadro nuevo y registro de mensajes entre hilos,
+compartidos por los afinadores (afinador.py, afinador_pro.py y afinador_jimena.py).
+
+Requirements:
+  tkinter (o customtkinter, que usa los mismos widgets)
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+MIN_FRAME_MS = 33  # Como máximo ~30 refrescos por segundo
+POLL_MS = 25  # Revisión de pedidos de otros hilos mientras llegan cuadros
+IDLE_POLL_MS = 250  # Revisión lenta tras IDLE_POLLS revisiones seguidas sin pedidos
+IDLE_POLLS = 20
+LOG_LINES = 200  # Mensajes que guarda el registro
+LOG_REPEAT_SECONDS = 2.0  # Un mismo mensaje se muestra como máximo una vez en este lapso
+LOG_FLUSH_MS = 100  # Cada cuánto revisa el hilo de Tk si hay mensajes nuevos
+
+
+class DisplayRefresher:
+    """Redibuja la interfaz cuando hay algo nuevo en vez de cada 50 ms.
+
+    ``request()`` se puede llamar desde cualquier hilo (es el
+    ``update_callback`` del Tuner). Fuera del hilo de Tk sólo levanta una
+    bandera, sin tocar Tk: Tk no es seguro entre hilos y una llamada desde
+    otro hilo espera a que el hilo de Tk la atienda, que puede estar esperando
+    a su vez al hilo de análisis (``Tuner.stop``, ``Tuner.set_engine``).
+    Entre ``start()`` y ``stop()`` (mientras corre el afinador) el hilo de Tk
+    revisa la bandera cada ``poll_ms``, o cada ``idle_poll_ms`` después de
+    ``idle_polls`` revisiones seguidas sin pedidos (reposo), y los pedidos que
+    llegan mientras tanto se juntan en un solo refresco. En el hilo de Tk el
+    pedido llama a ``draw`` en el próximo momento libre, pero no antes de
+    ``min_frame_ms`` desde el refresco anterior (tope mientras llegan cuadros
+    seguidos). Con el afinador detenido no corre nada.
+
+    ``configure(widget, **props)`` lleva cuenta de lo último enviado a cada
+    widget y sólo pasa a Tk las propiedades que cambiaron; ``invalidate()``
+    olvida esa cuenta (por ejemplo tras configurar los widgets a mano).
+    """
+
+    def __init__(self, root, draw, min_frame_ms=MIN_FRAME_MS, poll_ms=POLL_MS,
+                 idle_poll_ms=IDLE_POLL_MS, idle_polls=IDLE_POLLS):
+        self.root = root
+        self.draw = draw
+        self.min_frame_ms = min_frame_ms
+        self.poll_ms = poll_ms
+        self.idle_poll_ms = idle_poll_ms
+        self.idle_polls = idle_polls
+        self.frames = 0  # Refrescos hechos
+        self._tk_thread = threading.current_thread()
+        self._requested = False  # Pedido desde otro hilo, pendiente de revisar
+        self._empty_polls = 0
+        self._job = None
+        self._poll_job = None
+        self._last_frame = 0.0
+        self._props = {}
+
+    def request(self):
+        """Pide un refresco; seguro desde cualquier hilo y nunca llama a Tk fuera del suyo"""
+        if threading.current_thread() is self._tk_thread:
+            self.schedule()
+        else:
+            self._requested = True
+
+    def start(self):
+        """Empieza a revisar los pedidos de otros hilos (hilo de Tk)"""
+        self._empty_polls = 0
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def stop(self):
+        """Deja de revisar; un pedido que quedó pendiente se atiende igual (hilo de Tk)"""
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        if self._requested:
+            self._requested = False
+            self.schedule()
+
+    def _poll(self):
+        if self._requested:
+            # Se baja antes de dibujar: un pedido posterior no se pierde
+            self._requested = False
+            self._empty_polls = 0
+            self.schedule()
+        else:
+            self._empty_polls += 1
+        delay = self.poll_ms if self._empty_polls < self.idle_polls else self.idle_poll_ms
+        self._poll_job = self.root.after(delay, self._poll)
+
+    def schedule(self):
+        """Programa un refresco respetando ``min_frame_ms`` (hilo de Tk)"""
+        if self._job is not None:
+            return
+        wait_ms = self.min_frame_ms - 1000 * (time.monotonic() - self._last_frame)
+        if wait_ms > 0:
+            self._job = self.root.after(int(wait_ms) + 1, self._run)
+        else:
+            self._job = self.root.after_idle(self._run)
+
+    def _run(self):
+        self._job = None
+        self._last_frame = time.monotonic()
+        self.frames += 1
+        self.draw()
+
+    def cancel(self):
+        for job in (self._job, self._poll_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self._job = None
+        self._poll_job = None
+
+    def configure(self, widget, **props):
+        """``widget.configure`` sólo con las propiedades que cambiaron"""
+        shown = self._props.setdefault(widget, {})
+        changed = {key: value for key, value in props.items()
+                   if key not in shown or shown[key] != value}
+        if changed:
+            shown.update(changed)
+            widget.configure(**changed)
+
+    def invalidate(self):
+        self._props.clear()
+
+
+class LogBus:
+    """Registro de mensajes seguro entre hilos, volcado en tandas a la interfaz.
+
+    ``post(message)`` es el ``log_callback`` del Tuner y se llama desde el hilo
+    de audio o de análisis: sólo anota la hora, agrega el mensaje a un búfer
+    circular de ``maxlen`` (``deque``) y levanta la bandera de un
+    ``DisplayRefresher`` propio, sin llamar a Tk ni compartir más estado; si
+    la interfaz se atrasa se pierden los más viejos. El resto corre en
+    ``flush()``, sólo en el hilo de Tk: un mensaje idéntico a uno mostrado
+    hace menos de ``repeat_seconds`` se descarta y se cuenta, y la próxima
+    vez que se muestre lleva la cuenta de repeticiones.
+
+    Entre ``start()`` y ``stop()`` el hilo de Tk revisa la bandera cada
+    ``flush_ms`` y vuelca lo encolado con un solo ``write(lines)``; los
+    mensajes además quedan en ``lines``. Sin ``write`` no hay revisión
+    periódica: quien quiera leer ``lines`` llama antes a ``flush()``.
+    """
+
+    def __init__(self, root, write=None, maxlen=LOG_LINES, repeat_seconds=LOG_REPEAT_SECONDS,
+                 flush_ms=LOG_FLUSH_MS):
+        self.write = write
+        self.repeat_seconds = repeat_seconds
+        self.lines = deque(maxlen=maxlen)  # Últimos mensajes ya volcados
+        self.suppressed = 0  # Repeticiones descartadas
+        self.dropped = 0  # Mensajes perdidos por atraso de la interfaz
+        self._queue = deque(maxlen=maxlen)
+        self._seen = {}  # mensaje -> [último momento mostrado, repeticiones] (sólo hilo de Tk)
+        self.refresher = DisplayRefresher(root, self.flush, min_frame_ms=flush_ms,
+                                          poll_ms=flush_ms) if write else None
+
+    def post(self, message):
+        """Encola un mensaje; seguro desde cualquier hilo y nunca llama a Tk fuera del suyo"""
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append((time.time(), message))
+        if self.refresher:
+            self.refresher.request()
+
+    def flush(self):
+        """Vuelca lo encolado con una sola llamada a ``write`` (hilo de Tk)"""
+        batch = []
+        while self._queue:
+            stamp, message = self._queue.popleft()
+            seen = self._seen.get(message)
+            if seen is not None and stamp - seen[0] < self.repeat_seconds:
+                seen[1] += 1
+                self.suppressed += 1
+                continue
+            if len(self._seen) >= self.lines.maxlen:
+                # Los mensajes con números casi nunca se repiten: se olvidan los vencidos
+                self._seen = {key: value for key, value in self._seen.items()
+                              if stamp - value[0] < self.repeat_seconds}
+            self._seen[message] = [stamp, 0]
+            if seen is not None and seen[1]:
+                message = f"{message} (repetido {seen[1]} veces)"
+            batch.append(f"[{datetime.fromtimestamp(stamp):%H:%M:%S}] {message}")
+        if batch:
+            self.lines.extend(batch)
+            if self.write:
+                self.write(batch)
+
+    def start(self):
+        if self.refresher:
+            self.refresher.start()
+
+    def stop(self):
+        if self.refresher:
+            self.refresher.stop()
+
+    def cancel(self):
+        if self.refresher:
+            self.refresher.cancel()
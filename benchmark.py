@@ -0,0 +1,352 @@
+"""
+Micro-benchmarks de las etapas del afinador
+
+Uso:
+  python benchmark.py hps
+  python benchmark.py batch
+  python benchmark.py refine
+  python benchmark.py detectors
+  python benchmark.py classify
+  python benchmark.py lock
+  python benchmark.py tracker
+"""
+
+import argparse
+import copy
+import time
+import tracemalloc
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from afinador_dsp import (
+    BandGate,
+    HPSKernel,
+    HPSPitchEstimator,
+    PitchTracker,
+    SpectrumEngine,
+    make_spectrum_engine,
+    octave_band_edges,
+)
+from afinador_motor import (
+    DETECTORS,
+    GUITAR_TARGETS,
+    PROFILES,
+    Tuner,
+    make_detector,
+    ukulele_targets,
+)
+
+SAMPLE_FREQ = 48000
+WINDOW_SIZE = 32768
+NUM_HPS = 5
+
+
+def synth_tone(freq, n=WINDOW_SIZE, fs=SAMPLE_FREQ, harmonics=8, noise=0.01, seed=0):
+    """Tono sintético con armónicos decrecientes y ruido blanco"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / fs
+    x = sum((0.7 ** k) * np.sin(2 * np.pi * freq * (k + 1) * t + rng.uniform(0, np.pi))
+            for k in range(harmonics))
+    x = x + noise * rng.standard_normal(n)
+    return (0.1 * x).astype(np.float32)
+
+
+def legacy_hps_peak(magnitude_spec, num_hps=NUM_HPS):
+    """Bucle HPS original de audio_callback (referencia)"""
+    ipol_x = np.arange(0, len(magnitude_spec))
+    ipol_x2 = np.arange(0, len(magnitude_spec), 1 / num_hps)
+    mag_spec_ipol = np.interp(ipol_x2, ipol_x, magnitude_spec)
+
+    norm = np.linalg.norm(mag_spec_ipol, ord=2)
+    if norm > 0:
+        mag_spec_ipol = mag_spec_ipol / norm
+
+    hps_spec = copy.deepcopy(mag_spec_ipol)
+
+    for factor in range(2, num_hps + 1):
+        decimated = mag_spec_ipol[::factor]
+        limit = min(len(hps_spec), len(decimated))
+        tmp = hps_spec[:limit] * decimated[:limit]
+        if not np.any(tmp):
+            break
+        hps_spec = tmp
+
+    return int(np.argmax(hps_spec))
+
+
+class LegacySmoother:
+    """Cadena original de update_pitch (referencia): promedio móvil de 5,
+    EMA y 5 cuerdas iguales seguidas"""
+
+    def __init__(self, targets, buffer_size=5, alpha=0.35, stable_frames=5):
+        self.targets = np.array(sorted(targets))
+        self.buffer_size = buffer_size
+        self.alpha = alpha
+        self.stable_frames = stable_frames
+        self.freq_buffer, self.stable_buffer, self.frequency = [], [], None
+
+    def update(self, freq):
+        self.freq_buffer.append(freq)
+        if len(self.freq_buffer) > self.buffer_size:
+            self.freq_buffer.pop(0)
+        avg = sum(self.freq_buffer) / len(self.freq_buffer)
+        self.frequency = avg if self.frequency is None else (1 - self.alpha) * avg + self.alpha * self.frequency
+        string = int(np.argmin(np.abs(np.log2(self.targets / self.frequency))))
+        self.stable_buffer.insert(0, string)
+        self.stable_buffer = self.stable_buffer[:self.stable_frames]
+        return True
+
+    @property
+    def locked(self):
+        return (len(self.stable_buffer) == self.stable_frames
+                and self.stable_buffer.count(self.stable_buffer[0]) == self.stable_frames)
+
+
+def measure(func, arg, repeats):
+    """Devuelve (ms por cuadro, bytes reservados en el pico de un cuadro)"""
+    func(arg)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(arg)
+    elapsed = (time.perf_counter() - start) / repeats
+
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1e3, peak
+
+
+def bench_hps(repeats):
+    spectrum = SpectrumEngine(WINDOW_SIZE, SAMPLE_FREQ)
+    kernel = HPSKernel(spectrum.n_bins, NUM_HPS)
+    cutoff_bins = int(50 / spectrum.delta_freq)
+
+    freqs = [82.41, 110.0, 146.83, 196.0, 246.94, 261.63, 329.63, 392.0, 440.0, 587.33]
+    mismatches = 0
+    for i, freq in enumerate(freqs):
+        mag = spectrum.magnitude(synth_tone(freq, seed=i)).copy()
+        mag[:cutoff_bins] = 0.0
+        if legacy_hps_peak(mag) != kernel.peak_index(mag):
+            mismatches += 1
+    print(f"Índices de pico distintos: {mismatches}/{len(freqs)}")
+
+    # Banda de búsqueda del perfil de ukelele (la fundamental entre 196 y 587 Hz)
+    low, high = PROFILES["ukulele"].freq_range
+    banded = HPSKernel(spectrum.n_bins, NUM_HPS,
+                       band=(low / spectrum.delta_freq, high / spectrum.delta_freq))
+
+    mag = spectrum.magnitude(synth_tone(261.63)).copy()
+    mag[:cutoff_bins] = 0.0
+    for name, func in (("original", legacy_hps_peak), ("HPSKernel", kernel.peak_index),
+                       ("banda", banded.peak_index)):
+        ms, peak = measure(func, mag, repeats)
+        print(f"{name:10} {ms:7.3f} ms/cuadro  {peak / 1024:9.1f} KiB reservados")
+
+
+def bench_batch(repeats, n_hops=16):
+    """Atraso de n_hops saltos: cuadro por cuadro vs estimate_batch"""
+    signal = np.concatenate([synth_tone(f, n=WINDOW_SIZE // 2, seed=i)
+                             for i, f in enumerate([196.0, 261.63, 329.63, 440.0] * 4)])
+    configs = [("full", WINDOW_SIZE), ("zoom", WINDOW_SIZE), ("full", 8192), ("full", 4096)]
+    for mode, window_size in configs:
+        spectrum = make_spectrum_engine(window_size, SAMPLE_FREQ, mode=mode, max_freq=600.0 * NUM_HPS)
+        estimator = HPSPitchEstimator(
+            spectrum,
+            BandGate(octave_band_edges(50, 25600), spectrum.delta_freq, spectrum.n_bins, 0.2),
+            HPSKernel(spectrum.n_bins, NUM_HPS),
+            cutoff_freq=50,
+        )
+        hop = window_size // 4
+        frames = sliding_window_view(signal, window_size)[::hop][:n_hops]
+
+        single = [estimator.estimate(frame) for frame in frames]
+        batch = estimator.estimate_batch(frames)
+        same = np.allclose(single, batch)
+
+        runs = max(1, repeats // 20)
+        start = time.perf_counter()
+        for _ in range(runs):
+            for frame in frames:
+                estimator.estimate(frame)
+        per_frame = (time.perf_counter() - start) / runs
+        start = time.perf_counter()
+        for _ in range(runs):
+            estimator.estimate_batch(frames)
+        batched = (time.perf_counter() - start) / runs
+        print(f"{mode:4} {window_size:6}  {len(frames)} saltos: cuadro a cuadro {per_frame * 1e3:7.2f} ms"
+              f" | lote {batched * 1e3:7.2f} ms | mismos resultados: {same}")
+
+
+def bench_refine(n_tones=100):
+    """Error en cents del HPS sin y con refinamiento sub-bin, por tamaño de ventana"""
+    rng = np.random.default_rng(0)
+    freqs = rng.uniform(150, 450, n_tones)
+    for window_size in (WINDOW_SIZE, 8192, 4096):
+        spectrum = SpectrumEngine(window_size, SAMPLE_FREQ)
+        errors = {}
+        for refine in (0, 3):
+            estimator = HPSPitchEstimator(
+                spectrum,
+                BandGate(octave_band_edges(50, 25600), spectrum.delta_freq, spectrum.n_bins, 0.2),
+                HPSKernel(spectrum.n_bins, NUM_HPS),
+                cutoff_freq=50,
+                refine_harmonics=refine,
+            )
+            detected = [estimator.estimate(synth_tone(f, n=window_size, noise=0.05, seed=i))
+                        for i, f in enumerate(freqs)]
+            errors[refine] = np.abs(1200 * np.log2(np.array(detected) / freqs))
+        print(f"{window_size:6} ({1000 * window_size / SAMPLE_FREQ:4.0f} ms)"
+              f"  sin refinar: máx {errors[0].max():6.2f} cents"
+              f" | refinado: máx {errors[3].max():5.3f} cents, mediana {np.median(errors[3]):5.3f}")
+
+
+def bench_detectors(repeats, detune_cents=17.0):
+    """Compara los detectores registrados sobre las cuerdas de guitarra y ukelele"""
+    strings = sorted(set(GUITAR_TARGETS.values()) | set(ukulele_targets().values()))
+    noise = 0.01 * np.random.default_rng(0).standard_normal(WINDOW_SIZE).astype(np.float32)
+    # Cada detector tal cual y diezmado x8 (a 6 kHz, como con DECIMATION_FACTOR = 8)
+    for name, decimation in [(name, factor) for factor in (1, 8) for name in sorted(DETECTORS)]:
+        def build(target):
+            # Los detectores de banda angosta conocen la cuerda; el tono está desafinado
+            options = {"target_freq": target} if DETECTORS[name].narrowband else {}
+            if DETECTORS[name].needs_targets:
+                options["targets"] = strings
+            return make_detector(name, min_freq=50.0, max_freq=650.0, decimation=decimation, **options)
+
+        errors, gross, confidences = [], 0, []
+        for i, target in enumerate(strings):
+            freq = target * 2 ** (detune_cents / 1200)
+            detector = build(target)
+            detector.feed(synth_tone(freq, n=detector.window_size, noise=0.05, seed=i))
+            result = detector.detect()
+            confidences.append(result.confidence)
+            cents = abs(1200 * np.log2(result.frequency / freq)) if result.frequency > 0 else np.inf
+            if cents > 50:
+                gross += 1
+            else:
+                errors.append(cents)
+
+        ms, _ = measure(lambda _: detector.detect(), None, repeats)
+        detector = build(strings[-1])
+        detector.feed(noise[:detector.window_size])
+        noise_confidence = detector.detect().confidence
+        latency = 1000 * detector.window_size / SAMPLE_FREQ
+        label = name if decimation == 1 else f"{name}/{decimation}"
+        print(f"{label:10} {detector.window_size:6} muestras ({latency:4.0f} ms)"
+              f" | error máx {max(errors, default=np.inf):5.2f} cents | groseros {gross}/{len(strings)}"
+              f" | {ms:6.3f} ms/cuadro | confianza tono {np.mean(confidences):.2f}, ruido {noise_confidence:.2f}")
+
+
+def bench_classify(n_frames=100):
+    """Preclasificador tono/ruido: aciertos por tipo de cuadro y costo frente al HPS"""
+    rng = np.random.default_rng(0)
+    strings = sorted(set(GUITAR_TARGETS.values()) | set(ukulele_targets().values()))
+    kinds = {
+        "tono (ruido 0.3)": (True, lambda i: synth_tone(strings[i % len(strings)], noise=0.3, seed=i)),
+        "tono (ruido 1.0)": (True, lambda i: synth_tone(strings[i % len(strings)], noise=1.0, seed=i)),
+        "ruido blanco": (False, lambda i: 0.1 * rng.standard_normal(WINDOW_SIZE).astype(np.float32)),
+        "ruido marrón": (False, lambda i: 0.01 * np.cumsum(rng.standard_normal(WINDOW_SIZE)).astype(np.float32)),
+    }
+    detector = make_detector("hps", min_freq=50.0, max_freq=650.0)
+    for name, (expected, make) in kinds.items():
+        hits = 0
+        for i in range(n_frames):
+            detector.feed(make(i))
+            hits += detector.classifier.is_pitched(detector.window_buffer.view()) == expected
+        print(f"{name:17} {hits:3}/{n_frames} bien clasificados")
+
+    detector.feed(synth_tone(196.0))
+    window = detector.window_buffer.view()
+    classify_ms, _ = measure(detector.classifier.is_pitched, window, 200)
+    hps_ms, _ = measure(detector.estimator.estimate, window, 200)
+    print(f"preclasificador {classify_ms:6.3f} ms | FFT+HPS {hps_ms:6.3f} ms"
+          f" | cada cuadro de ruido salteado ahorra {hps_ms - classify_ms:6.3f} ms")
+
+
+def bench_lock(note_seconds=2.0, block=1024):
+    """Tiempo de audio desde cada ataque hasta la primera lectura estable de la cuerda nueva"""
+    profile = PROFILES["ukulele"]
+    names = list(profile.targets) * 2
+    n = int(note_seconds * SAMPLE_FREQ)
+    decay = np.exp(-np.arange(n) / (0.6 * SAMPLE_FREQ)).astype(np.float32)
+    signal = np.concatenate([synth_tone(profile.targets[name], n=n, noise=0.05, seed=i) * decay
+                             for i, name in enumerate(names)])
+
+    for engine in ("hps", "sdft", "multires"):
+        for onset_reset in (False, True):
+            tuner = Tuner(profile, engine=engine, onset_reset=onset_reset)
+            hop = tuner.detector.hop_size
+            locks, pending = {}, 0
+            for start in range(0, len(signal) - block + 1, block):
+                tuner.feed(signal[start:start + block])
+                pending += block
+                if pending >= hop:
+                    pending -= hop
+                    tuner.analyze_window()
+                note, offset = divmod(start + block, n)
+                if note not in locks and tuner.is_stable and tuner.current_string == names[note % len(names)]:
+                    locks[note] = 1000 * offset / SAMPLE_FREQ
+            locks = [locks.get(note, np.inf) for note in range(len(names))]
+            print(f"{engine:8} reinicio por ataque {'sí' if onset_reset else 'no'}"
+                  f" | mediana {np.median(locks):6.0f} ms | peor {max(locks):6.0f} ms"
+                  f" | sin estabilizar {np.isinf(locks).sum()}/{len(names)}")
+
+
+def bench_tracker(n_notes=200, readings=20, noise_cents=3.0, octave_rate=0.1):
+    """Convergencia del seguimiento: lecturas hasta confirmar la nota y error
+    con lecturas ruidosas y saltos de octava"""
+    rng = np.random.default_rng(0)
+    targets = list(ukulele_targets().values())
+    trackers = {
+        "original": lambda: LegacySmoother(targets),
+        "PitchTracker": PitchTracker,
+    }
+    for name, build in trackers.items():
+        to_lock, errors, worst, start = [], [], [], time.perf_counter()
+        for _ in range(n_notes):
+            freq = rng.choice(targets) * 2 ** (rng.uniform(-30, 30) / 1200)
+            cents = rng.normal(0, noise_cents, readings)
+            octave = rng.random(readings) < octave_rate
+            cents[octave] += 1200 * rng.choice([-1, 1], octave.sum())
+            tracker, locked_at, note_errors = build(), None, []
+            for i, reading in enumerate(freq * 2 ** (cents / 1200)):
+                tracker.update(reading)
+                if tracker.locked:
+                    locked_at = i + 1 if locked_at is None else locked_at
+                    note_errors.append(abs(1200 * np.log2(tracker.frequency / freq)))
+            to_lock.append(locked_at or np.inf)
+            errors += note_errors
+            worst.append(max(note_errors, default=np.inf))
+        us = 1e6 * (time.perf_counter() - start) / (n_notes * readings)
+        print(f"{name:12} lecturas hasta confirmar: mediana {np.median(to_lock):4.1f}"
+              f" | sin confirmar {np.isinf(to_lock).sum():3}/{n_notes}"
+              f" | error confirmado: mediana {np.median(errors):5.2f} cents"
+              f" | alguna lectura confirmada a >50 cents {(np.array(worst) > 50).sum():3}/{n_notes}"
+              f" | {us:5.1f} us/lectura")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks del afinador")
+    parser.add_argument("stage", choices=["hps", "batch", "refine", "detectors", "classify", "lock", "tracker"])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.stage == "hps":
+        bench_hps(args.repeats)
+    elif args.stage == "batch":
+        bench_batch(args.repeats)
+    elif args.stage == "refine":
+        bench_refine()
+    elif args.stage == "detectors":
+        bench_detectors(args.repeats)
+    elif args.stage == "classify":
+        bench_classify()
+    elif args.stage == "lock":
+        bench_lock()
+    elif args.stage == "tracker":
+        bench_tracker()
+
+
+if __name__ == "__main__":
+    main()